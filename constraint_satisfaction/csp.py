@@ -0,0 +1,347 @@
+import random
+
+
+# Domains are integer bitsets over the indices of each variable's value
+# list: bit a set <=> values[var][a] is still possible. Removing values,
+# testing for supports and picking the smallest domain are all plain
+# integer operations.
+
+
+def bits(bitset):
+    """ Indices of the bits set, lowest first. """
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+def popcount(bitset):
+    return bin(bitset).count('1')
+
+
+class BinaryConstraint:
+    """ Constraint between two variables given by a predicate over their
+        values. Supports are precomputed as bitsets: support[0][a] holds
+        the values of the second variable compatible with value a of the
+        first one, support[1][b] the other way round. """
+
+    def __init__(self, csp, first, second, predicate):
+        self.scope = (first, second)
+        first_values, second_values = csp.values[first], csp.values[second]
+        self.support = ([0] * len(first_values), [0] * len(second_values))
+        for a, first_value in enumerate(first_values):
+            for b, second_value in enumerate(second_values):
+                if predicate(first_value, second_value):
+                    self.support[0][a] |= 1 << b
+                    self.support[1][b] |= 1 << a
+
+    def supports(self, var, value):
+        """ Bitset of values of the other variable compatible with
+            var = value (value is an index). """
+        return self.support[0 if var == self.scope[0] else 1][value]
+
+    def other(self, var):
+        return self.scope[1] if var == self.scope[0] else self.scope[0]
+
+    def prune(self, domains, var):
+        """ Forward checking once var is assigned. """
+        other = self.other(var)
+        value = domains[var].bit_length() - 1
+        domains[other] &= self.supports(var, value)
+        return domains[other] != 0
+
+    def is_consistent(self, domains, var, unassigned):
+        """ Is the value of var compatible with the other variable,
+            if that one is assigned already? """
+        other = self.other(var)
+        if other in unassigned:
+            return True
+        value = domains[var].bit_length() - 1
+        return bool(self.supports(var, value) >> (
+            domains[other].bit_length() - 1) & 1)
+
+    def is_satisfied(self, assignment):
+        first, second = self.scope
+        return bool(self.support[0][assignment[first]] >> assignment[second] & 1)
+
+    # Local search - the state is the assignment itself.
+
+    def local_init(self, assignment):
+        self.assignment = assignment
+
+    def local_conflicts(self, var, value):
+        other = self.other(var)
+        return 0 if self.supports(var, value) >> self.assignment[other] & 1 \
+            else 1
+
+    def local_move(self, var, old_value, new_value):
+        pass
+
+
+class AllDifferent:
+    """ Global constraint - key(var, value) differs for every variable of
+        the scope. The default key is the value itself; N-Queens uses
+        row - column and row + column for the diagonals. """
+
+    def __init__(self, csp, scope, key=None):
+        self.scope = list(scope)
+        if key is None:
+            key = lambda var, value: value
+        # keys[var][a] and, per key, the bitset of values mapping to it
+        self.keys = {}
+        self.key_bits = {}
+        for var in self.scope:
+            var_keys = [key(var, value) for value in csp.values[var]]
+            self.keys[var] = var_keys
+            self.key_bits[var] = {}
+            for a, value_key in enumerate(var_keys):
+                self.key_bits[var][value_key] = \
+                    self.key_bits[var].get(value_key, 0) | 1 << a
+
+    def prune(self, domains, var):
+        """ Remove the key taken by var from the rest of the scope. """
+        taken = self.keys[var][domains[var].bit_length() - 1]
+        for other in self.scope:
+            if other != var:
+                domains[other] &= ~self.key_bits[other].get(taken, 0)
+                if not domains[other]:
+                    return False
+        return True
+
+    def is_consistent(self, domains, var, unassigned):
+        """ Is the key of var free among the assigned variables? """
+        taken = self.keys[var][domains[var].bit_length() - 1]
+        return all(other == var or other in unassigned or
+                   self.keys[other][domains[other].bit_length() - 1] != taken
+                   for other in self.scope)
+
+    def is_satisfied(self, assignment):
+        taken = [self.keys[var][assignment[var]] for var in self.scope]
+        return len(set(taken)) == len(taken)
+
+    # Local search - how many variables use every key (like row_queens
+    # and the diagonal counters of SolveNQueens).
+
+    def local_init(self, assignment):
+        self.assignment = assignment
+        self.key_counts = {}
+        for var in self.scope:
+            value_key = self.keys[var][assignment[var]]
+            self.key_counts[value_key] = self.key_counts.get(value_key, 0) + 1
+
+    def local_conflicts(self, var, value):
+        value_key = self.keys[var][value]
+        count = self.key_counts.get(value_key, 0)
+        if self.keys[var][self.assignment[var]] == value_key:
+            count -= 1
+        return count
+
+    def local_move(self, var, old_value, new_value):
+        old_key, new_key = self.keys[var][old_value], self.keys[var][new_value]
+        self.key_counts[old_key] -= 1
+        self.key_counts[new_key] = self.key_counts.get(new_key, 0) + 1
+
+
+class CSP:
+    """ Constraint satisfaction problem: named variables with finite
+        domains, binary constraints and global constraints. """
+
+    def __init__(self):
+        self.names = []
+        self.values = []
+        self.domains = []
+        self.constraints = []
+        self.var_constraints = []  # constraints per variable
+        self.arcs = []  # binary constraints per variable
+
+    def add_variable(self, name, values):
+        """ New variable, returns its index. """
+        self.names.append(name)
+        self.values.append(list(values))
+        self.domains.append((1 << len(self.values[-1])) - 1)
+        self.var_constraints.append([])
+        self.arcs.append([])
+        return len(self.names) - 1
+
+    def __add(self, constraint):
+        self.constraints.append(constraint)
+        for var in constraint.scope:
+            self.var_constraints[var].append(constraint)
+        return constraint
+
+    def add_constraint(self, first, second, predicate):
+        """ Binary constraint predicate(value_first, value_second). """
+        constraint = self.__add(BinaryConstraint(self, first, second,
+                                                 predicate))
+        self.arcs[first].append(constraint)
+        self.arcs[second].append(constraint)
+        return constraint
+
+    def add_all_different(self, scope, key=None):
+        return self.__add(AllDifferent(self, scope, key))
+
+    def degree(self, var):
+        return len(self.var_constraints[var])
+
+    def to_solution(self, assignment):
+        """ Value indices to a {name: value} dict. """
+        return {self.names[var]: self.values[var][value]
+                for var, value in enumerate(assignment)}
+
+    def is_solution(self, assignment):
+        return all(constraint.is_satisfied(assignment)
+                   for constraint in self.constraints)
+
+
+def propagate(csp, domains, changed=None, algorithm='ac3'):
+    """ Arc consistency over the binary constraints (AC-3, or AC-2001
+        with residual supports), interleaved with global constraint
+        pruning for variables whose domain became a single value.
+        domains is narrowed in place, returns False on a wipe-out. """
+    if changed is None:
+        changed = range(len(domains))
+    queue = []
+    queued = set()
+    singletons = []
+
+    def enqueue_into(var):
+        """ Every arc (other -> var) must be revised again. """
+        for constraint in csp.arcs[var]:
+            arc = (constraint.other(var), constraint)
+            if arc not in queued:
+                queued.add(arc)
+                queue.append(arc)
+        if popcount(domains[var]) == 1:
+            singletons.append(var)
+
+    for var in changed:
+        enqueue_into(var)
+    residual = {}
+    while queue or singletons:
+        while queue:
+            var, constraint = queue.pop()
+            queued.discard((var, constraint))
+            other = constraint.other(var)
+            other_domain = domains[other]
+            removed = 0
+            for value in bits(domains[var]):
+                if algorithm == 'ac2001':
+                    last = residual.get((constraint, var, value))
+                    if last is not None and other_domain >> last & 1:
+                        continue
+                supported = constraint.supports(var, value) & other_domain
+                if not supported:
+                    removed |= 1 << value
+                elif algorithm == 'ac2001':
+                    residual[(constraint, var, value)] = \
+                        (supported & -supported).bit_length() - 1
+            if removed:
+                domains[var] &= ~removed
+                if not domains[var]:
+                    return False
+                enqueue_into(var)
+        while singletons:
+            var = singletons.pop()
+            for constraint in csp.var_constraints[var]:
+                if isinstance(constraint, BinaryConstraint):
+                    continue
+                before = [domains[other] for other in constraint.scope]
+                if not constraint.prune(domains, var):
+                    return False
+                for other, domain in zip(constraint.scope, before):
+                    if domains[other] != domain:
+                        enqueue_into(other)
+    return True
+
+
+def select_variable(csp, domains, unassigned):
+    """ MRV - smallest domain first, ties broken by degree. """
+    return min(unassigned,
+               key=lambda var: (popcount(domains[var]), -csp.degree(var)))
+
+
+def backtracking_search(csp, forward_checking=True, maintain_arc=False,
+                        algorithm='ac3'):
+    """ Backtracking with MRV/degree ordering and an explicit stack.
+        Arc consistency runs once up front. After each assignment the
+        constraints of the variable prune its neighbours (forward
+        checking), or full arc consistency is kept (maintain_arc).
+        With neither, the new value is only checked against the
+        variables assigned so far.
+        Returns a {name: value} dict or None. """
+    domains = list(csp.domains)
+    if not propagate(csp, domains, algorithm=algorithm):
+        return None
+    unassigned = set(range(len(domains)))
+    if not unassigned:
+        return {}
+    var = select_variable(csp, domains, unassigned)
+    unassigned.discard(var)
+    # frame: (variable, values left to try, domains before assigning it)
+    stack = [(var, domains[var], domains)]
+    while stack:
+        var, values_left, saved = stack.pop()
+        if not values_left:
+            unassigned.add(var)
+            continue
+        value = values_left.bit_length() - 1
+        stack.append((var, values_left & ~(1 << value), saved))
+
+        domains = list(saved)
+        domains[var] = 1 << value
+        if maintain_arc:
+            consistent = propagate(csp, domains, [var], algorithm)
+        elif forward_checking:
+            consistent = all(constraint.prune(domains, var)
+                             for constraint in csp.var_constraints[var])
+        else:
+            # Plain backtracking - check against the assigned neighbours
+            consistent = all(constraint.is_consistent(domains, var, unassigned)
+                             for constraint in csp.var_constraints[var])
+        if not consistent:
+            continue
+        if not unassigned:
+            assignment = [domain.bit_length() - 1 for domain in domains]
+            if csp.is_solution(assignment):
+                return csp.to_solution(assignment)
+            continue
+        next_var = select_variable(csp, domains, unassigned)
+        unassigned.discard(next_var)
+        stack.append((next_var, domains[next_var], domains))
+    return None
+
+
+def min_conflicts(csp, max_steps=100000, initial=None, seed=None):
+    """ Min-conflicts local search. Every constraint keeps its own
+        incremental state, so the conflicts of a value are a sum of
+        cheap lookups. initial is a list of value indices (random by
+        default). Returns a {name: value} dict or None. """
+    rng = random.Random(seed)
+    if initial is None:
+        initial = [rng.choice(list(bits(domain))) for domain in csp.domains]
+    assignment = list(initial)
+    for constraint in csp.constraints:
+        constraint.local_init(assignment)
+
+    def conflicts(var, value):
+        return sum(constraint.local_conflicts(var, value)
+                   for constraint in csp.var_constraints[var])
+
+    for _ in range(max_steps):
+        conflicted = [var for var in range(len(assignment))
+                      if conflicts(var, assignment[var])]
+        if not conflicted:
+            return csp.to_solution(assignment)
+        var = rng.choice(conflicted)
+        scores = [(conflicts(var, value), value)
+                  for value in bits(csp.domains[var])]
+        best = min(scores)[0]
+        new_value = rng.choice([value for score, value in scores
+                                if score == best])
+        old_value = assignment[var]
+        if new_value == old_value:
+            continue
+        for constraint in csp.var_constraints[var]:
+            constraint.local_move(var, old_value, new_value)
+        assignment[var] = new_value
+    return None
@@ -1,14 +1,43 @@
+import multiprocessing
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import numpy as np
 import time
+from csp import CSP, backtracking_search, min_conflicts
+
+
+SOLUTION_MAGIC = b'NQUEENS1'
+SOLUTION_HEADER = struct.Struct('<8sQ4s')
+CHUNK = 1 << 20  # columns per chunk for bulk passes and file output
 
 
 class SolveNQueens:
-    def __init__(self, size):
+    def __init__(self, size, memmap_dir=None):
+        """ Arrays use the smallest safe dtypes: int32 row positions
+            (int64 from 2 ** 30 queens on, so column + row still fits)
+            and counters sized for at most size queens on a line. With
+            memmap_dir every O(size) array - the board, the counters and
+            the work arrays of initialize_linear and solve - is backed by
+            a file in that directory, the heap only holds O(CHUNK)
+            temporaries. """
         self.size = size
-        self.queens = np.zeros((size, ), dtype=int)
-        self.row_queens = np.zeros((size, ), dtype=int)  # depends on initial placement strategy
-        self.main_diagonal_queens = np.zeros((2 * size - 1, ), dtype=int)
-        self.rev_diagonal_queens = np.zeros((2 * size - 1, ), dtype=int)
+        self.memmap_dir = memmap_dir
+        self.position_dtype = np.int32 if size < 2 ** 30 else np.int64
+        self.counter_dtype = np.min_scalar_type(size)
+        self.queens = self.allocate('queens', size, self.position_dtype)
+        self.row_queens = self.allocate('row_queens', size, self.counter_dtype)  # depends on initial placement strategy
+        self.main_diagonal_queens = self.allocate('main_diagonal_queens',
+                                                  2 * size - 1, self.counter_dtype)
+        self.rev_diagonal_queens = self.allocate('rev_diagonal_queens',
+                                                 2 * size - 1, self.counter_dtype)
+
+    def allocate(self, name, length, dtype):
+        """ Zeroed array, memory-mapped if memmap_dir is set. """
+        if self.memmap_dir is None:
+            return np.zeros((length, ), dtype=dtype)
+        return np.memmap(os.path.join(self.memmap_dir, name + '.dat'),
+                         dtype=dtype, mode='w+', shape=(max(length, 1), ))[:length]
 
     def __str__(self):
         if self.size <= 50:
@@ -18,39 +47,107 @@ class SolveNQueens:
                 return_string[(self.size + 1) * row + column] = '*'
             return "".join(return_string)
         else:
-            return "Board is too big. Printing time instead..."
+            return "Board of " + str(self.size) + " queens, rows of the " \
+                "first columns: " + str(self.queens[:10].tolist())[:-1] + \
+                ", ...] - use write_solution() for the full board."
+
+    def write_solution(self, path, binary=True):
+        """ Stream the board to a file chunk by chunk, never building
+            one big string. Binary files hold a small header and the raw
+            row of every column, text files one row per line. """
+        with open(path, 'wb' if binary else 'w') as solution_file:
+            if binary:
+                solution_file.write(SOLUTION_HEADER.pack(
+                    SOLUTION_MAGIC, self.size,
+                    np.dtype(self.position_dtype).newbyteorder('<').str
+                    .encode('ascii')))
+            for begin in range(0, self.size, CHUNK):
+                chunk = self.queens[begin:begin + CHUNK]
+                if binary:
+                    solution_file.write(chunk.astype(
+                        np.dtype(self.position_dtype).newbyteorder('<'))
+                        .tobytes())
+                else:
+                    np.savetxt(solution_file, chunk, fmt='%d')
+
+    def shuffle_rows(self):
+        """ Random permutation of the rows, built in place. """
+        for begin in range(0, self.size, CHUNK):
+            self.queens[begin:begin + CHUNK] = np.arange(
+                begin, min(begin + CHUNK, self.size), dtype=self.position_dtype)
+        np.random.shuffle(self.queens)
 
     def initialize_random(self):
         """ Random initial board set-up.
             No two queens conflict row-wise or column-wise. """
+        self.shuffle_rows()
+        self.count_lines()
 
-        self.queens = np.random.choice(np.arange(self.size), replace=False,
-                                       size=(self.size))
-        print(self.queens)
-
-        main_diagonal = self.queens - np.arange(self.size)
-        rev_diagonal = self.queens + np.arange(self.size)
+    def count_lines(self):
+        """ Queens per row and per diagonal for the current placement.
+            Counted in chunks, so no full-size int64 temporaries. """
+        for counts in (self.row_queens, self.main_diagonal_queens,
+                       self.rev_diagonal_queens):
+            counts[:] = 0
+        for begin in range(0, self.size, CHUNK):
+            rows = self.queens[begin:begin + CHUNK]
+            columns = np.arange(begin, begin + rows.shape[0],
+                                dtype=self.position_dtype)
+            np.add.at(self.row_queens, rows, 1)
+            np.add.at(self.main_diagonal_queens,
+                      columns - rows + (self.size - 1), 1)
+            np.add.at(self.rev_diagonal_queens, columns + rows, 1)
 
-        unique, counts = np.unique(main_diagonal, return_counts=True)
-        for _ in zip(unique, counts):
-            self.main_diagonal_queens[unique + self.size - 1] = counts
-        self.main_diagonal_queens = np.flip(self.main_diagonal_queens)
-
-        unique, counts = np.unique(rev_diagonal, return_counts=True)
-        for _ in zip(unique, counts):
-            self.rev_diagonal_queens[unique] = counts
+    def initialize_linear(self, max_tries=100):
+        """ O(n) initialization in the style of Sosic and Gu.
+            Start from a random permutation (no row conflicts) and walk
+            the columns - each queen is swapped with a random later one
+            until it lands on two free diagonals. After max_tries failed
+            probes the queen stays put, leaving only a few conflicts
+            for solve() to repair. """
+        size = self.size
+        self.shuffle_rows()
+        # memoryviews index the (possibly memory-mapped) arrays with
+        # plain Python ints, nearly as fast as lists
+        queens = memoryview(self.queens)
+        main_taken = memoryview(self.allocate('main_taken', 2 * size - 1,
+                                              np.uint8))
+        rev_taken = memoryview(self.allocate('rev_taken', 2 * size - 1,
+                                             np.uint8))
+        probes = []
+        for column in range(size):
+            for _ in range(max_tries):
+                if not probes:
+                    probes = np.random.random_sample(4096).tolist()
+                other = column + int(probes.pop() * (size - column))
+                queens[column], queens[other] = queens[other], queens[column]
+                row = queens[column]
+                if not main_taken[column - row + size - 1] and \
+                        not rev_taken[column + row]:
+                    break
+                queens[column], queens[other] = queens[other], queens[column]
+            row = queens[column]
+            main_taken[column - row + size - 1] = 1
+            rev_taken[column + row] = 1
+        queens.release()
+        main_taken.release()
+        rev_taken.release()
+        self.count_lines()
 
     def initialize_min_conflict(self):
         """ Best possible initialization.
             Greedy strategy (min-conflict) guarantees we always
             choose a less conflicted spot for the next queen. """
+        for array in (self.queens, self.row_queens, self.main_diagonal_queens,
+                      self.rev_diagonal_queens):
+            array[:] = 0
         self.queens[0] = np.random.choice(np.arange(self.size))
         self.row_queens[self.queens[0]] += 1
         self.main_diagonal_queens[-self.queens[0] + self.size - 1] += 1
         self.rev_diagonal_queens[self.queens[0]] += 1
 
         for column in range(1, self.size):
-            conflicts_column = self.row_queens + \
+            conflicts_column = self.row_queens.astype(np.int32) + \
                 self.main_diagonal_queens[self.size + column - 1: column - 1: -1] + \
                 self.rev_diagonal_queens[column : self.size + column : 1]
             place_queen_row = np.random.choice(np.where(conflicts_column == np.amin(conflicts_column))[0])
@@ -59,64 +156,393 @@ class SolveNQueens:
             self.main_diagonal_queens[column - place_queen_row + self.size - 1] += 1
             self.rev_diagonal_queens[column + place_queen_row] += 1
 
-    def solve(self):
-        """ Solver method. """
+    def solve(self, max_steps=None, stop_event=None):
+        """ Solver method.
+            Conflict counts are kept per queen and updated incrementally -
+            a move only touches the queens sharing the row or diagonals
+            the moved queen leaves or enters. Returns True once the board
+            is valid, False after max_steps moves (by default 50 per
+            queen, at least 1000) or when stop_event (checked every 64
+            steps) is set. """
+        size = self.size
+        if max_steps is None:
+            max_steps = max(1000, 50 * size)
+        rows = self.queens
 
-        conflicts = self.get_conflicts()
-        count = 0
-        while np.amax(conflicts) > 0 and count < 60:
-            max_conflicts = np.amax(conflicts)
-            move_queen_from_column = np.random.choice(np.where(conflicts == np.amax(conflicts))[0])
-            move_queen_from_row = self.queens[move_queen_from_column]
+        def columns(begin, end):
+            return np.arange(begin, end, dtype=self.position_dtype)
 
-            conflicts_column = np.zeros((self.size, ), dtype=int)
-            for queen_row in range(self.size):
-                conflicts_column[queen_row] = self.row_queens[queen_row] + \
-                    self.main_diagonal_queens[move_queen_from_column - queen_row + self.size - 1] + \
-                    self.rev_diagonal_queens[move_queen_from_column + queen_row]
-            conflicts_column[move_queen_from_row] = max_conflicts
+        lines = (QueenLines(lambda begin, end: rows[begin:end], size, size,
+                            self.allocate, 'row_lines'),
+                 QueenLines(lambda begin, end: columns(begin, end) -
+                            rows[begin:end] + (size - 1),
+                            size, 2 * size - 1, self.allocate, 'main_lines'),
+                 QueenLines(lambda begin, end: columns(begin, end) +
+                            rows[begin:end],
+                            size, 2 * size - 1, self.allocate, 'rev_lines'))
+        line_counts = (self.row_queens, self.main_diagonal_queens,
+                       self.rev_diagonal_queens)
+        buckets = ConflictBuckets(
+            self.get_conflicts(self.allocate('conflicts', size, np.int32)),
+            self.allocate)
 
-            move_queen_to_row = np.random.choice(np.where(conflicts_column == np.amin(conflicts_column))[0]) 
+        step = 0
+        while buckets.max_conflicts() > 0:
+            if step >= max_steps:
+                return False
+            if stop_event is not None and step % 64 == 0 and \
+                    stop_event.is_set():
+                return False
+            step += 1
+            move_queen_from_column = buckets.random_max()
+            move_queen_from_row = self.queens[move_queen_from_column]
+            move_queen_to_row = self.best_row(
+                move_queen_from_column, move_queen_from_row,
+                buckets.conflicts[move_queen_from_column])
+            if move_queen_to_row == move_queen_from_row:
+                continue
 
+            old_lines = (move_queen_from_row,
+                         move_queen_from_column - move_queen_from_row + size - 1,
+                         move_queen_from_column + move_queen_from_row)
+            new_lines = (move_queen_to_row,
+                         move_queen_from_column - move_queen_to_row + size - 1,
+                         move_queen_from_column + move_queen_to_row)
+            for queen_lines, counts, line in zip(lines, line_counts, old_lines):
+                queen_lines.remove(move_queen_from_column, line)
+                counts[line] -= 1
+                for column in queen_lines.members(line):
+                    buckets.decrement(column)
             self.queens[move_queen_from_column] = move_queen_to_row
+            for queen_lines, counts, line in zip(lines, line_counts, new_lines):
+                for column in queen_lines.members(line):
+                    buckets.increment(column)
+                queen_lines.insert(move_queen_from_column, line)
+                counts[line] += 1
+            buckets.set(move_queen_from_column,
+                        sum(int(counts[line]) for counts, line
+                            in zip(line_counts, new_lines)) - 3)
+        return True
+
+    def best_row(self, column, current_row, current_conflicts):
+        """ Uniformly random row of the column with the fewest
+            conflicts. Rows are scanned in chunks of slice gathers,
+            summed in int32 so small counter dtypes cannot overflow. """
+        size = self.size
+        best, candidates = None, []
+        for begin in range(0, size, CHUNK):
+            end = min(begin + CHUNK, size)
+            conflicts_chunk = self.row_queens[begin:end].astype(np.int32) + \
+                self.main_diagonal_queens[column + size - end:
+                                          column + size - begin][::-1] + \
+                self.rev_diagonal_queens[column + begin:column + end]
+            if begin <= current_row < end:
+                conflicts_chunk[current_row - begin] = current_conflicts
+            lowest = conflicts_chunk.min()
+            if best is None or lowest < best:
+                best, candidates = lowest, []
+            if lowest == best:
+                candidates.append(np.flatnonzero(conflicts_chunk == lowest) +
+                                  begin)
+        pick = np.random.randint(sum(rows.shape[0] for rows in candidates))
+        for rows in candidates:
+            if pick < rows.shape[0]:
+                return rows[pick]
+            pick -= rows.shape[0]
+
+    def solve_with_restarts(self, strategy='luby', base_steps=None,
+                            initialization='linear', max_restarts=None,
+                            stop_event=None):
+        """ Min-conflicts with restarts. Every run starts from a fresh
+            initialization and is cut off after base_steps times the
+            next Luby number ('luby') or times 2 ** restart ('geometric').
+            Returns True once a valid board is found. """
+        if base_steps is None:
+            base_steps = max(60, self.size // 10)
+        restart = 0
+        while max_restarts is None or restart <= max_restarts:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            if strategy == 'luby':
+                limit = base_steps * luby(restart + 1)
+            elif strategy == 'geometric':
+                limit = base_steps * 2 ** restart
+            else:
+                raise ValueError('Unknown restart strategy: ' + str(strategy))
+            getattr(self, 'initialize_' + initialization)()
+            if self.solve(limit, stop_event):
+                return True
+            restart += 1
+        return False
+
+    def solve_csp(self, method='min_conflicts', max_steps=100000):
+        """ Solve through the generic CSP engine (see queens_csp).
+            min_conflicts starts from the current board, backtracking
+            uses MRV with forward checking. """
+        csp = queens_csp(self.size)
+        if method == 'backtracking':
+            solution = backtracking_search(csp)
+        else:
+            solution = min_conflicts(csp, max_steps,
+                                     initial=self.queens.tolist())
+        if solution is None:
+            return False
+        self.queens[:] = [solution[column] for column in range(self.size)]
+        self.count_lines()
+        return True
+
+    def get_conflicts(self, out=None):
+        """ Calculate conflicts for current configuration.
+            Computed in chunks into out (a new int32 array by default). """
+        if out is None:
+            out = np.empty((self.size, ), dtype=np.int32)
+        for begin in range(0, self.size, CHUNK):
+            rows = self.queens[begin:begin + CHUNK]
+            columns = np.arange(begin, begin + rows.shape[0],
+                                dtype=self.position_dtype)
+            conflicts = out[begin:begin + rows.shape[0]]
+            conflicts[:] = self.row_queens[rows]
+            conflicts += self.main_diagonal_queens[columns - rows +
+                                                   (self.size - 1)]
+            conflicts += self.rev_diagonal_queens[columns + rows]
+            conflicts -= 3
+        return out
+
+
+def queens_csp(size):
+    """ N-Queens as a CSP - one variable per column with the rows as
+        values, rows and both diagonals all different. """
+    csp = CSP()
+    columns = [csp.add_variable(column, range(size)) for column in range(size)]
+    csp.add_all_different(columns)
+    csp.add_all_different(columns, key=lambda column, row: row - column)
+    csp.add_all_different(columns, key=lambda column, row: row + column)
+    return csp
+
+
+def read_solution(path):
+    """ Memory-mapped rows of a binary file from write_solution. """
+    with open(path, 'rb') as solution_file:
+        magic, size, dtype = SOLUTION_HEADER.unpack(
+            solution_file.read(SOLUTION_HEADER.size))
+    if magic != SOLUTION_MAGIC:
+        raise ValueError('Not an N-Queens solution file!')
+    dtype = dtype.rstrip(b'\x00').decode('ascii')
+    if size == 0:
+        return np.zeros((0, ), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r',
+                     offset=SOLUTION_HEADER.size, shape=(size, ))
+
+
+def _allocate_in_memory(name, length, dtype):
+    return np.zeros((length, ), dtype=dtype)
+
+
+class QueenLines:
+    """ Queens grouped by line (row or diagonal) as intrusive doubly
+        linked lists over column indices - O(1) insert and remove,
+        members of a line are walked without scanning the board.
+        line_of(begin, end) gives the lines of a range of columns, the
+        lists are built CHUNK columns at a time into arrays from
+        allocate (see SolveNQueens.allocate). """
 
-            self.row_queens[move_queen_from_row] -= 1
-            self.main_diagonal_queens[move_queen_from_column - move_queen_from_row + self.size - 1] -= 1
-            self.rev_diagonal_queens[move_queen_from_column + move_queen_from_row] -= 1
+    def __init__(self, line_of, size, num_lines, allocate=None, name='lines'):
+        allocate = allocate or _allocate_in_memory
+        index_dtype = np.int32 if size < 2 ** 31 else np.int64
+        self.head = allocate(name + '_head', num_lines, index_dtype)
+        self.next = allocate(name + '_next', size, index_dtype)
+        self.prev = allocate(name + '_prev', size, index_dtype)
+        for array in (self.head, self.next, self.prev):
+            array[:] = -1
+        for begin in range(0, size, CHUNK):
+            lines = line_of(begin, min(begin + CHUNK, size))
+            order = np.argsort(lines, kind='stable')
+            sorted_lines = lines[order]
+            columns = (order + begin).astype(index_dtype)
+            same_line = sorted_lines[1:] == sorted_lines[:-1]
+            self.next[columns[:-1][same_line]] = columns[1:][same_line]
+            self.prev[columns[1:][same_line]] = columns[:-1][same_line]
+            # Every line's group goes in front of the chunks before it
+            first = np.concatenate(([True], ~same_line))
+            last = np.concatenate((~same_line, [True]))
+            old_heads = self.head[sorted_lines[first]]
+            self.next[columns[last]] = old_heads
+            self.prev[old_heads[old_heads >= 0]] = \
+                columns[last][old_heads >= 0]
+            self.head[sorted_lines[first]] = columns[first]
 
-            self.row_queens[move_queen_to_row] += 1
-            self.main_diagonal_queens[move_queen_from_column - move_queen_to_row + self.size - 1] += 1
-            self.rev_diagonal_queens[move_queen_from_column + move_queen_to_row] += 1
+    def insert(self, column, line):
+        head = self.head[line]
+        self.next[column] = head
+        self.prev[column] = -1
+        if head >= 0:
+            self.prev[head] = column
+        self.head[line] = column
 
-            conflicts = self.get_conflicts()
-            count += 1
+    def remove(self, column, line):
+        prev, next = self.prev[column], self.next[column]
+        if prev >= 0:
+            self.next[prev] = next
+        else:
+            self.head[line] = next
+        if next >= 0:
+            self.prev[next] = prev
+
+    def members(self, line):
+        column = self.head[line]
+        while column >= 0:
+            yield column
+            column = self.next[column]
+
+
+class ConflictBuckets:
+    """ Per-queen conflict counts with the columns kept sorted by count.
+        Count c occupies order[start[c]:start[c + 1]], so the worst
+        queen is always at the end and +-1 updates are a single swap.
+        The order is built by a chunked counting sort, start only spans
+        the counts seen so far and grows on demand. """
+
+    def __init__(self, conflicts, allocate=None):
+        allocate = allocate or _allocate_in_memory
+        size = conflicts.shape[0]
+        index_dtype = np.int32 if size < 2 ** 31 else np.int64
+        self.conflicts = conflicts
+        self.order = allocate('order', size, index_dtype)
+        self.position = allocate('position', size, index_dtype)
+
+        counts = np.zeros((1, ), dtype=np.int64)
+        for begin in range(0, size, CHUNK):
+            chunk_counts = np.bincount(conflicts[begin:begin + CHUNK])
+            counts = np.pad(counts, (0, max(0, chunk_counts.shape[0] -
+                                            counts.shape[0])))
+            counts[:chunk_counts.shape[0]] += chunk_counts
+        self.start = np.zeros((counts.shape[0] + 1, ), dtype=index_dtype)
+        np.cumsum(counts, out=self.start[1:])
+        fill = self.start[:-1].astype(np.int64)
+        for begin in range(0, size, CHUNK):
+            chunk = conflicts[begin:begin + CHUNK]
+            order = np.argsort(chunk, kind='stable')
+            chunk_counts = np.bincount(chunk, minlength=counts.shape[0])
+            group_start = np.cumsum(chunk_counts) - chunk_counts
+            sorted_counts = chunk[order]
+            positions = fill[sorted_counts] + np.arange(order.shape[0]) - \
+                group_start[sorted_counts]
+            self.order[positions] = order + begin
+            self.position[order + begin] = positions
+            fill += chunk_counts
+
+    def __swap(self, column, index):
+        other = self.order[index]
+        here = self.position[column]
+        self.order[index], self.order[here] = column, other
+        self.position[column], self.position[other] = index, here
+
+    def increment(self, column):
+        count = self.conflicts[column]
+        if count + 2 > self.start.shape[0]:
+            self.start = np.append(self.start, np.full(
+                (count + 2 - self.start.shape[0], ), self.order.shape[0],
+                dtype=self.start.dtype))
+        self.__swap(column, self.start[count + 1] - 1)
+        self.start[count + 1] -= 1
+        self.conflicts[column] = count + 1
+
+    def decrement(self, column):
+        count = self.conflicts[column]
+        self.__swap(column, self.start[count])
+        self.start[count] += 1
+        self.conflicts[column] = count - 1
+
+    def set(self, column, count):
+        while self.conflicts[column] < count:
+            self.increment(column)
+        while self.conflicts[column] > count:
+            self.decrement(column)
+
+    def max_conflicts(self):
+        return self.conflicts[self.order[-1]]
 
-        if count == 60:
-            self.solve()
-            return
+    def random_max(self):
+        """ Uniformly random column among the most conflicted. """
+        first = self.start[self.max_conflicts()]
+        return self.order[np.random.randint(first, self.order.shape[0])]
 
-    def get_conflicts(self):
-        """ Calculate conflicts for current configuration. """
-        conflicts = np.zeros((self.size, ), dtype=int)
-        for queen_column in range(self.size):
-            queen_row = self.queens[queen_column]
-            conflicts[queen_column] += self.row_queens[queen_row] + \
-                self.main_diagonal_queens[queen_column - queen_row + self.size - 1] + \
-                self.rev_diagonal_queens[queen_column + queen_row] - 3
-        return conflicts
+
+def luby(index):
+    """ index-th term (from 1) of the Luby sequence 1 1 2 1 1 2 4 ... """
+    while True:
+        bits = 1
+        while (1 << bits) - 1 < index:
+            bits += 1
+        if (1 << bits) - 1 == index:
+            return 1 << (bits - 1)
+        index -= (1 << (bits - 1)) - 1
+
+
+_portfolio = {}
+
+
+def _init_portfolio(stop_event):
+    _portfolio['stop'] = stop_event
+
+
+def _portfolio_run(size, seed, strategy, initialization):
+    """ One independently seeded solver of the portfolio. """
+    np.random.seed(seed)
+    game = SolveNQueens(size)
+    if game.solve_with_restarts(strategy, initialization=initialization,
+                                stop_event=_portfolio['stop']):
+        return game.queens
+    return None
+
+
+def solve_portfolio(size, workers=None, seed=None, strategy='luby',
+                    initialization='linear'):
+    """ Run independent seeded solvers in a process pool and return the
+        queens of the first valid board. The remaining solvers are told
+        to stop and their pending runs are cancelled. """
+    workers = workers or os.cpu_count()
+    seeds = np.random.SeedSequence(seed).generate_state(workers)
+    stop_event = multiprocessing.Event()
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_portfolio,
+                             initargs=(stop_event, )) as pool:
+        pending = {pool.submit(_portfolio_run, size, int(run_seed),
+                               strategy, initialization)
+                   for run_seed in seeds}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result() is not None:
+                    stop_event.set()
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+    return None
 
 
 def main():
     """ User interaction.
         Request desired input size."""
     size = int(input('Enter number of queens: ').strip())
+    strategy = input('Initialization (min_conflict, random, linear) '
+                     '[min_conflict]: ').strip() or 'min_conflict'
+
+    workers = int(input('Portfolio workers (1 = single solver) [1]: ')
+                  .strip() or 1)
 
     start_time = time.process_time()
     game = SolveNQueens(size)
-    game.initialize_min_conflict()
-    game.solve()
+    if workers > 1:
+        game.queens[:] = solve_portfolio(size, workers,
+                                         initialization=strategy)
+    else:
+        game.solve_with_restarts(initialization=strategy)
     print(game)
     print(" --- %.5f seconds ---" % (time.process_time() - start_time))
+    path = input('Save the board to (empty to skip): ').strip()
+    if path:
+        game.write_solution(path, binary=not path.endswith('.txt'))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+# Exhaustive N-Queens by bitmask backtracking: queens are placed row by
+# row and the occupied columns and both diagonals are integers, so the
+# free squares of a row are one AND-NOT. Mirror symmetry halves the work
+# (the first queen stays in the left half) and the first two rows split
+# the search into independent tasks for a process pool.
+
+
+def _prefixes(size):
+    """ (first row column, second row column) tasks covering exactly one
+        of every mirrored pair of solutions. """
+    half = size // 2
+    for first in range(half):
+        for second in range(size):
+            if abs(second - first) > 1:
+                yield first, second
+    if size % 2:
+        # Middle queen first - its mirror differs in the second row.
+        for second in range(half - 1):
+            yield half, second
+
+
+def _prefix_masks(size, first, second):
+    """ Column and diagonal masks after the two prefix queens. """
+    full = (1 << size) - 1
+    columns, left, right = 0, 0, 0
+    for column in (first, second):
+        bit = 1 << column
+        columns |= bit
+        left = ((left | bit) << 1) & full
+        right = (right | bit) >> 1
+    return columns, left, right
+
+
+def count_completions(size, columns, left, right, row):
+    """ Number of ways to fill rows row..size-1 (explicit stack). """
+    if row == size:
+        return 1
+    full = (1 << size) - 1
+    count = 0
+    depth = row
+    free = [0] * size
+    column_masks, left_masks, right_masks = [0] * size, [0] * size, [0] * size
+    column_masks[depth], left_masks[depth], right_masks[depth] = \
+        columns, left, right
+    free[depth] = full & ~(columns | left | right)
+    while depth >= row:
+        available = free[depth]
+        if depth == size - 1:
+            count += bin(available).count('1')
+            depth -= 1
+            continue
+        if not available:
+            depth -= 1
+            continue
+        bit = available & -available
+        free[depth] = available ^ bit
+        columns = column_masks[depth] | bit
+        left = ((left_masks[depth] | bit) << 1) & full
+        right = (right_masks[depth] | bit) >> 1
+        depth += 1
+        column_masks[depth], left_masks[depth], right_masks[depth] = \
+            columns, left, right
+        free[depth] = full & ~(columns | left | right)
+    return count
+
+
+def enumerate_completions(size, columns, left, right, row, prefix):
+    """ All completions as an (solutions, size) array of queen columns
+        per row, mirrors not included. """
+    dtype = np.uint8 if size <= 256 else np.uint16
+    if row == size:
+        return np.array([prefix], dtype=dtype).reshape(1, size)
+    full = (1 << size) - 1
+    solutions = []
+    placed = list(prefix) + [0] * (size - row)
+    depth = row
+    free = [0] * size
+    column_masks, left_masks, right_masks = [0] * size, [0] * size, [0] * size
+    column_masks[depth], left_masks[depth], right_masks[depth] = \
+        columns, left, right
+    free[depth] = full & ~(columns | left | right)
+    while depth >= row:
+        available = free[depth]
+        if not available:
+            depth -= 1
+            continue
+        bit = available & -available
+        free[depth] = available ^ bit
+        placed[depth] = bit.bit_length() - 1
+        if depth == size - 1:
+            solutions.append(list(placed))
+            continue
+        columns = column_masks[depth] | bit
+        left = ((left_masks[depth] | bit) << 1) & full
+        right = (right_masks[depth] | bit) >> 1
+        depth += 1
+        column_masks[depth], left_masks[depth], right_masks[depth] = \
+            columns, left, right
+        free[depth] = full & ~(columns | left | right)
+    return np.array(solutions, dtype=dtype).reshape(-1, size)
+
+
+def _count_task(task):
+    size, (first, second) = task
+    return count_completions(size, *_prefix_masks(size, first, second), 2)
+
+
+def _enumerate_task(task):
+    size, (first, second) = task
+    half = enumerate_completions(size, *_prefix_masks(size, first, second),
+                                 2, (first, second))
+    return np.concatenate((half, size - 1 - half))
+
+
+def _small_board(size):
+    """ Boards below two rows have no prefix to split on. """
+    return np.zeros((1, size), dtype=np.uint8) if size <= 1 else \
+        np.zeros((0, size), dtype=np.uint8)
+
+
+def count_solutions(size, workers=None):
+    """ Number of N-Queens solutions. workers=1 runs in-process,
+        otherwise the two-row prefixes go to a process pool. """
+    if size < 2:
+        return _small_board(size).shape[0]
+    tasks = [(size, prefix) for prefix in _prefixes(size)]
+    if workers == 1:
+        return 2 * sum(map(_count_task, tasks))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return 2 * sum(pool.map(_count_task, tasks))
+
+
+def iter_solutions(size, workers=None):
+    """ Stream all solutions as compact (k, size) uint8 arrays - one
+        array per two-row prefix (its mirror images included), in
+        prefix order, as soon as the pool finishes them. """
+    if size < 2:
+        yield _small_board(size)
+        return
+    tasks = [(size, prefix) for prefix in _prefixes(size)]
+    if workers == 1:
+        for task in tasks:
+            yield _enumerate_task(task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for solutions in pool.map(_enumerate_task, tasks):
+            yield solutions
+
+
+def main():
+    """ Count the solutions for a requested board size. """
+    size = int(input('Enter number of queens: ').strip())
+    start_time = time.time()
+    print('Solutions:', count_solutions(size))
+    print(" --- %.5f seconds ---" % (time.time() - start_time))
+
+
+if __name__ == "__main__":
+    main()
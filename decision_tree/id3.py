@@ -1,6 +1,31 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 import numpy as np
 import pandas as pd
-import pprint
+
+# Split search always walks the candidates in chunks of SPLIT_CHUNK
+# features and the rows in blocks of at most SPLIT_BLOCK_CELLS codes,
+# so its temporaries stay bounded. Chunks go to a thread pool once a
+# node has at least PARALLEL_SPLIT_CELLS (rows x features) codes - the
+# bincount and gather work is NumPy, smaller nodes stay serial.
+PARALLEL_SPLIT_CELLS = 1 << 21
+SPLIT_CHUNK = 256
+SPLIT_BLOCK_CELLS = 1 << 18
+
+# Compiled tree file (little-endian): TREE_HEADER, UTF-8 JSON with the
+# feature names and categories, then int32 feature, child_offset,
+# children and label arrays.
+TREE_MAGIC = b'ID3TREE\x00'
+TREE_FORMAT_VERSION = 1
+TREE_HEADER = struct.Struct('<8sIIQQQ')
+TREE_SUFFIX = '.id3'
+
 
 def data_preprocessing(df):
     """ Remove or predict missing values in the data set. """
@@ -28,101 +53,202 @@ def data_preprocessing(df):
 
 
 def numeric_entropy(list_values):
-    """ Compute entropy given two probabilities """
+    """ Compute entropy given a list of probabilities """
     num_entropy = 0
     for value in list_values:
         if value == 0:
-            return 0
+            continue
         num_entropy -= value * np.log2(value)
     return num_entropy
 
 
+def encode_dataset(df, categories=None):
+    """ Encode every column once into small-integer category codes.
+        Returns (codes, categories): codes[i, j] indexes into the
+        sorted list categories[j] of the values of column j.
+        Given the categories of a training set, values it has not seen
+        are encoded as len(categories[j]). """
+    columns = []
+    if categories is None:
+        categories = []
+        for column in df.columns:
+            column_codes, column_values = pd.factorize(df[column], sort=True)
+            columns.append(column_codes)
+            categories.append(list(column_values))
+        largest = max([len(values) for values in categories], default=0)
+    else:
+        for column, values in zip(df.columns, categories):
+            column_codes = pd.Index(values).get_indexer(df[column])
+            columns.append(np.where(column_codes < 0, len(values),
+                                    column_codes))
+        largest = max([len(values) for values in categories], default=0) + 1
+    codes = np.empty(df.shape, dtype=np.min_scalar_type(largest))
+    for j, column_codes in enumerate(columns):
+        codes[:, j] = column_codes
+    return codes, categories
+
+
+def entropy_rows(counts):
+    """ Entropy of every row (last axis) of a count array, 0 log 0 = 0. """
+    counts = np.asarray(counts, dtype=float)
+    totals = counts.sum(axis=-1, keepdims=True)
+    probs = counts / np.maximum(totals, 1)
+    logs = np.log2(np.where(probs > 0, probs, 1))
+    return -(probs * logs).sum(axis=-1)
+
+
+def count_matrix(feature_codes, class_codes, num_values, num_classes):
+    """ counts[v, c] - instances with feature value v and class c,
+        from a single bincount over the combined codes. """
+    combined = feature_codes.astype(np.intp) * num_classes + class_codes
+    return np.bincount(combined, minlength=num_values * num_classes).reshape(
+        num_values, num_classes)
+
+
+def information_gains(feature_codes, class_codes, num_values, num_classes):
+    """ Information gain of every column of feature_codes (rows x
+        features) at once. One bincount builds the (feature, value,
+        class) count tensor, the entropies are computed on top of it. """
+    counts = count_tensor(feature_codes, class_codes, num_values, num_classes)
+    return gains_from_counts(counts, np.bincount(class_codes,
+                                                 minlength=num_classes))
+
+
+def count_tensor(feature_codes, class_codes, num_values, num_classes):
+    """ (feature, value, class) counts of the rows of feature_codes. """
+    features = feature_codes.shape[1]
+    combined = (np.arange(features) * num_values +
+                feature_codes.astype(np.intp)) * num_classes + \
+        class_codes.astype(np.intp)[:, None]
+    counts = np.bincount(combined.ravel(),
+                         minlength=features * num_values * num_classes)
+    return counts.reshape(features, num_values, num_classes)
+
+
+def gains_from_counts(counts, class_counts):
+    """ Information gain of every feature from its (value, class) count
+        matrix - counts is (features, values, classes), class_counts
+        the class counts of the same instances. """
+    conditional = (counts.sum(axis=2) * entropy_rows(counts)).sum(axis=1)
+    return entropy_rows(class_counts) - \
+        conditional / max(int(class_counts.sum()), 1)
+
+
 def entropy(feature_df, feature):
     """ Compute entropy of attribute with respect to a given category.
         Suitable for more than two classes, too. """
-
-    total_size = feature_df.shape[0]
-    entropy = 0
-
-    # IDEA
-    # 1) Select unique values for classes and features
-    # 2) Traverse features for values and build dictionaries for each of the classes
-    # 3) These dictionaries are stored in a list
-    # 4) The list is iterated and all useful information is extracted to compute entropy
-
-    list_values = feature_df[feature].unique()
-    list_categories = []
-
-    for category in feature_df["class"].unique():
-        category_dict = {}
-        for value in list_values:
-            category_dict[value] = 0
-        for value in feature_df.loc[feature_df["class"] == category][feature]:
-            category_dict[value] += 1
-        list_categories.append(category_dict)
-
-    for value in list_values:
-        value_prob = 0
-        list_entropy = []
-        for cnt in range(len(list_categories)):
-            value_prob += list_categories[cnt][value]
-            list_entropy.append(list_categories[cnt][value] / (feature_df[feature] == value).sum(axis=0))
-        value_prob = value_prob / total_size
-        entropy += value_prob * numeric_entropy(list_entropy)
-
-    return entropy
+    codes, categories = encode_dataset(feature_df[["class", feature]])
+    counts = count_matrix(codes[:, 1], codes[:, 0],
+                          len(categories[1]), len(categories[0]))
+    return (counts.sum(axis=1) @ entropy_rows(counts)) / \
+        max(feature_df.shape[0], 1)
+
+
+def split_gains(codes, rows, candidates, class_codes, num_values,
+                num_classes, pool=None):
+    """ Information gain of the candidate features for the given rows.
+        Features are evaluated in chunks and rows in blocks, so only a
+        block of codes is copied at a time. With a pool, wide nodes
+        spread their feature chunks over it. """
+    class_counts = np.bincount(class_codes[rows], minlength=num_classes)
+
+    def chunk_gains(chunk):
+        block = max(1, SPLIT_BLOCK_CELLS // chunk.shape[0])
+        counts = np.zeros((chunk.shape[0], num_values, num_classes),
+                          dtype=np.int64)
+        for begin in range(0, rows.shape[0], block):
+            block_rows = rows[begin:begin + block]
+            counts += count_tensor(codes[np.ix_(block_rows, chunk)],
+                                   class_codes[block_rows], num_values,
+                                   num_classes)
+        return gains_from_counts(counts, class_counts)
+
+    chunks = np.array_split(candidates,
+                            max(1, -(-candidates.shape[0] // SPLIT_CHUNK)))
+    if pool is None or candidates.shape[0] <= SPLIT_CHUNK or \
+            rows.shape[0] * candidates.shape[0] < PARALLEL_SPLIT_CELLS:
+        return np.concatenate([chunk_gains(chunk) for chunk in chunks])
+    return np.concatenate(list(pool.map(chunk_gains, chunks)))
+
+
+def build_tree_encoded(codes, categories, names, limit=4, target=0,
+                       default=None, workers=None):
+    """ ID3 over an encoded matrix (see encode_dataset). Nodes only carry
+        an array of row indices and a mask of the features still
+        available, the tree is grown with an explicit work stack.
+        Large nodes evaluate their splits on a pool of workers threads
+        (workers=1 keeps everything serial).
+        Returns the same nested dict as build_decision_tree. """
+    class_codes = codes[:, target]
+    num_classes = len(categories[target])
+    features = np.array([j for j in range(codes.shape[1]) if j != target],
+                        dtype=np.intp)
+    num_values = max([len(categories[j]) for j in features], default=1)
+
+    def majority(rows):
+        return categories[target][
+            np.bincount(class_codes[rows], minlength=num_classes).argmax()]
+
+    all_rows = np.arange(codes.shape[0])
+    if default is None and all_rows.shape[0]:
+        default = majority(all_rows)
+    root = {}
+    # work item: (row indices, remaining feature mask, parent class,
+    #             dict to store the subtree in, key in that dict)
+    stack = [(all_rows, np.ones(features.shape[0], dtype=bool), default,
+              root, None)]
+    parallel = workers != 1 and \
+        codes.shape[0] * features.shape[0] >= PARALLEL_SPLIT_CELLS
+    with ThreadPoolExecutor(max_workers=workers) if parallel \
+            else nullcontext() as pool:
+        while stack:
+            rows, remaining, parent_node_class, container, key = stack.pop()
+            node_classes = np.unique(class_codes[rows])
+
+            # Stop conditions
+            # 1) All instances have the same class -- return that class
+            # 2) Less than K instances -- return the parent's class
+            # 3) All features have been expended -- return the parent's class
+            if node_classes.shape[0] == 1:
+                container[key] = categories[target][node_classes[0]]
+                continue
+            if rows.shape[0] < limit or not remaining.any():
+                container[key] = parent_node_class
+                continue
+
+            candidates = features[remaining]
+            gains = split_gains(codes, rows, candidates, class_codes,
+                                num_values, num_classes, pool)
+            best = int(np.argmax(gains))
+            best_feature = candidates[best]
+            node_class = majority(rows)
+
+            # Split the row indices by the value of the best feature
+            values = codes[rows, best_feature]
+            order = np.argsort(values, kind='stable')
+            counts = np.bincount(values, minlength=len(categories[best_feature]))
+            child_remaining = remaining.copy()
+            child_remaining[np.flatnonzero(remaining)[best]] = False
+
+            parts = np.split(rows[order], np.cumsum(counts)[:-1])
+
+            branches = {}
+            container[key] = {names[best_feature]: branches}
+            for value in np.flatnonzero(counts):
+                stack.append((parts[value], child_remaining, node_class,
+                              branches, categories[best_feature][value]))
+    return root[None] if root else default
 
 
 def build_decision_tree(df_current, df_original, limit=4, parent_node_class=None):
-    """ ID3 algorithm for decision tree. """
-
-    # Stop conditions - recursion base
-    # 1) All instances have the same class --
-    #    -- return that class
-    if len(df_current["class"].unique()) == 1:
-        return df_current["class"].values[0]
-
-    # 2) The dataset passed has less than K instances --
-    #    -- return most common class in original dataset
-    if df_current.shape[0] < limit:
-        if limit == 1:
-            return df_original["class"].value_counts.idxmax()
-        return parent_node_class
-
-    # 3) All features have been expended --
-    #    -- return to previous node and return most common class
-    column_names = df_current.columns.tolist()[1:]
-    if len(column_names) == 0:
-        return parent_node_class
-
-    total_size = df_current.shape[0]
-    no_recurrence_df = df_current.loc[df_current["class"] == "no-recurrence-events"]
-    recurrence_df = df_current.loc[df_current["class"] == "recurrence-events"]
-
-    # Calculate entropy of target
-    target_entropy = numeric_entropy([no_recurrence_df.shape[0] / total_size,
-                                      recurrence_df.shape[0] / total_size])
-
-    # For different attributes, calculate respective entropies
-    feature_gain_dict = {}
-
-    for feature in column_names:
-        feature_gain_dict[feature] = target_entropy - \
-            entropy(df_current[["class", feature]], feature)
-
-    best_feature = max(feature_gain_dict.items(), key=lambda x: x[1])[0]
-
-    # Get parent node class = best class according to the previous level of the tree
-    parent_node_class = df_current["class"].value_counts().idxmax()
-
-    tree = {best_feature: {}}
-    for value in df_current[best_feature].unique():
-        df_rec = df_current.loc[df_current[best_feature] == value]
-        df_rec = df_rec.drop(best_feature, axis=1)
-        subtree = build_decision_tree(df_rec, df_original, limit, parent_node_class)
-        tree[best_feature][value] = subtree
-
-    return tree
+    """ ID3 algorithm for decision tree. The class is the first column.
+        The data set is encoded once, the tree is then built on the
+        codes by build_tree_encoded. """
+    if parent_node_class is None and df_original.shape[0]:
+        parent_node_class = df_original["class"].value_counts().idxmax()
+    codes, categories = encode_dataset(df_current)
+    return build_tree_encoded(codes, categories, df_current.columns.tolist(),
+                              limit, target=0, default=parent_node_class)
 
 
 def test_query(query, tree, default="no-recurrence-events"):
@@ -136,55 +262,282 @@ def test_query(query, tree, default="no-recurrence-events"):
 
             result = tree[key][query[key]]
             if isinstance(result, dict):
-                return test_query(query, result)
+                return test_query(query, result, default)
             return result
+    return default
+
+
+def route_rows(codes, feature, child_offset, children):
+    """ Leaf reached by every row of an encoded matrix, given the node
+        arrays of a compiled tree (see CompiledTree). """
+    node = np.zeros(codes.shape[0], dtype=np.intp)
+    active = np.arange(codes.shape[0])
+    while active.shape[0]:
+        active = active[feature[node[active]] >= 0]
+        current = node[active]
+        values = codes[active, feature[current]]
+        node[active] = children[child_offset[current] + values]
+    return node
+
+
+class CompiledTree(object):
+    """ Nested dict tree flattened into parallel node arrays:
+        feature[node]      - column split on, -1 for leaves
+        child_offset[node] - start of the node's slice in children
+        children[...]      - child node per value code of the feature,
+                             the extra last slot (unseen values) and
+                             values without a branch lead to the
+                             default leaf
+        label[node]        - class code, for leaves
+        Node 0 is the root, node 1 the default leaf. """
+
+    def __init__(self, tree, categories, names, target=0, default=None):
+        self.classes = list(categories[target])
+        class_index = {value: code for code, value in enumerate(self.classes)}
+        column_index = {name: j for j, name in enumerate(names)}
+        value_index = [{value: code for code, value in enumerate(values)}
+                       for values in categories]
+        default_label = class_index.get(default, 0)
+
+        feature, child_offset, label = [], [], []
+        children = []
+
+        def new_node(subtree):
+            feature.append(-1)
+            child_offset.append(0)
+            label.append(class_index.get(subtree, default_label)
+                         if not isinstance(subtree, dict) else default_label)
+            return len(feature) - 1
+
+        stack = [(new_node(tree), tree)]
+        new_node(default)
+        while stack:
+            node, subtree = stack.pop()
+            if not isinstance(subtree, dict):
+                continue
+            (name, branches), = subtree.items()
+            column = column_index[name]
+            feature[node] = column
+            child_offset[node] = len(children)
+            children.extend([1] * (len(categories[column]) + 1))
+            for value, child_tree in branches.items():
+                child = new_node(child_tree)
+                children[child_offset[node] + value_index[column][value]] = \
+                    child
+                stack.append((child, child_tree))
+
+        self.categories = [list(values) for values in categories]
+        self.names = list(names)
+        self.target = target
+        self.feature = np.array(feature, dtype=np.intp)
+        self.child_offset = np.array(child_offset, dtype=np.intp)
+        self.children = np.array(children, dtype=np.intp)
+        self.label = np.array(label, dtype=np.intp)
+
+    @property
+    def num_nodes(self):
+        return self.feature.shape[0]
+
+    def predict(self, codes):
+        """ Class codes for every row of an encoded matrix (encoded with
+            the training categories). All rows move down one level per
+            step with a few NumPy gathers. """
+        return self.label[route_rows(codes, self.feature, self.child_offset,
+                                     self.children)]
+
+    def predict_labels(self, codes):
+        """ Like predict, but the class values themselves. """
+        return np.asarray(self.classes, dtype=object)[self.predict(codes)]
+
+    def to_bytes(self):
+        """ Binary form - header, JSON encoders, int32 node arrays. """
+        meta = json.dumps({"names": self.names,
+                           "categories": self.categories},
+                          default=_json_value).encode('utf-8')
+        arrays = [np.ascontiguousarray(array, dtype='<i4').tobytes()
+                  for array in (self.feature, self.child_offset,
+                                self.children, self.label)]
+        return TREE_HEADER.pack(TREE_MAGIC, TREE_FORMAT_VERSION, self.target,
+                                self.num_nodes, self.children.shape[0],
+                                len(meta)) + meta + b''.join(arrays)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < TREE_HEADER.size:
+            raise ValueError('Too short to be a compiled tree!')
+        magic, version, target, num_nodes, num_children, meta_size = \
+            TREE_HEADER.unpack_from(data)
+        if magic != TREE_MAGIC:
+            raise ValueError('Not a compiled tree: bad magic number!')
+        if version != TREE_FORMAT_VERSION:
+            raise ValueError('Unsupported tree version: ' + str(version))
+        offset = TREE_HEADER.size
+        meta = json.loads(data[offset:offset + meta_size].decode('utf-8'))
+        offset += meta_size
+
+        tree = cls.__new__(cls)
+        tree.names = meta["names"]
+        tree.categories = meta["categories"]
+        tree.target = target
+        tree.classes = list(tree.categories[target])
+        arrays = []
+        for count in (num_nodes, num_nodes, num_children, num_nodes):
+            arrays.append(np.frombuffer(data, dtype='<i4', count=count,
+                                        offset=offset).astype(np.intp))
+            offset += 4 * count
+        tree.feature, tree.child_offset, tree.children, tree.label = arrays
+        return tree
+
+    def save(self, path):
+        with open(path, 'wb') as tree_file:
+            tree_file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as tree_file:
+            return cls.from_bytes(tree_file.read())
+
+
+def _json_value(value):
+    """ NumPy scalars (e.g. integer categories) to plain Python. """
+    return value.item()
+
+
+def train_tree(codes, categories, names, limit=4, target=0, workers=None):
+    """ Build and compile a tree, the default leaf is the majority class. """
+    tree = build_tree_encoded(codes, categories, names, limit, target,
+                              workers=workers)
+    default = categories[target][np.bincount(
+        codes[:, target], minlength=len(categories[target])).argmax()]
+    return CompiledTree(tree, categories, names, target, default)
+
+
+class TreeCache(object):
+    """ Content-addressed on-disk cache of compiled trees. A file is
+        named by the hash of the training codes, the encoders, the
+        feature names and limit. Reads refresh the modification time,
+        and the least recently used files are removed once the
+        directory holds more than max_bytes. """
+
+    def __init__(self, directory, max_bytes=64 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(codes, categories, names, limit=4, target=0):
+        codes = np.ascontiguousarray(codes)
+        digest = hashlib.sha256()
+        digest.update(json.dumps([TREE_FORMAT_VERSION, codes.shape,
+                                  codes.dtype.str, list(names),
+                                  [list(values) for values in categories],
+                                  limit, target],
+                                 default=_json_value).encode('utf-8'))
+        digest.update(memoryview(codes).cast('B'))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + TREE_SUFFIX)
+
+    def get(self, key):
+        """ Cached tree or None. """
+        path = self.path(key)
+        try:
+            tree = CompiledTree.load(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return tree
+
+    def put(self, key, tree):
+        """ Store a tree (atomic rename), then enforce the size bound. """
+        path = self.path(key)
+        temporary = '%s.%d.tmp' % (path, os.getpid())
+        tree.save(temporary)
+        os.replace(temporary, path)
+        self.evict()
+
+    def evict(self):
+        """ Remove least recently used trees while over max_bytes,
+            the most recent one always stays. """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(TREE_SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def train(self, codes, categories, names, limit=4, target=0):
+        """ Cached train_tree - identical inputs load instead of rebuild. """
+        key = self.key(codes, categories, names, limit, target)
+        tree = self.get(key)
+        if tree is None:
+            tree = train_tree(codes, categories, names, limit, target)
+            self.put(key, tree)
+        return tree
+
+
+def train_fold(codes, rows, categories, names, limit=4, cache_dir=None):
+    """ Cross-validation hook - compiled tree trained on the given rows
+        of the encoded data set (class in column 0), optionally through
+        a TreeCache in cache_dir. """
+    if cache_dir is not None:
+        return TreeCache(cache_dir).train(codes[rows], categories, names,
+                                          limit)
+    return train_tree(codes[rows], categories, names, limit)
+
+
+def predict_fold(model, codes, rows):
+    """ Cross-validation hook - predicted class codes of the rows. """
+    return model.predict(codes[rows])
 
 
 def main():
     """ Decision Tree Implementation (ID3) """
+    # model_evaluation is a sibling script folder, not a package
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 '..', 'model_evaluation'))
+    from cross_validation import cross_validate
+
     list_names = ["class", "age", "menopause", "tumor-size", "inv-nodes",
                   "node-caps", "deg-malig", "breast", "breast-quad", "irradiat"]
 
     df = pd.read_csv("breast-cancer.data", names=list_names)
     limit = int(input("Please enter constant K: minimum number of instances required per tree level: ").strip())
+    seed = input("Seed to reuse cached trees (empty for a random run): ").strip()
 
     # NOTE - Data preprocessing required by breast-cancer.names
+    # A seed fixes the imputed values and the folds, so trees already
+    # trained for this K and seed are loaded from the cache
+    cache_dir = None
+    if seed:
+        seed = int(seed)
+        np.random.seed(seed)
+        cache_dir = os.path.join(tempfile.gettempdir(), "id3_tree_cache")
+    else:
+        seed = None
     df = data_preprocessing(df)
 
-    accuracy = 0
-    list_df = []
-    df_remainder = df
-
-    while len(list_df) < 10:
-        if len(list_df) < 5:
-            df_chunk = df_remainder.sample(n=28)
-        else:
-            df_chunk = df_remainder.sample(n=29)
-        df_remainder = df_remainder.drop(df_chunk.index)
-        list_df.append(df_chunk)
-
-    for index, test in enumerate(list_df):
-        test_dict = test.to_dict(orient="records")
-        train_df = pd.concat(list_df[:index] + list_df[index+1:])
-        tree = build_decision_tree(train_df, train_df, limit)
-        # pprint.pprint(tree)
-
-        train_dict = train_df.to_dict(orient="records")
-        train_accuracy = 0
-        for instance in train_dict:
-            guess_class = instance["class"]
-            if guess_class == test_query(instance, tree):
-                train_accuracy += 1 
-
-        test_accuracy = 0
-        for instance in test_dict:
-            guess_class = instance["class"]        
-            if guess_class == test_query(instance, tree):
-                test_accuracy += 1
-
-        print('Accuracy on turn', index, "-->", test_accuracy / len(test_dict))
-        accuracy += test_accuracy / len(test_dict)
-    print("Total accuracy is: ", accuracy / 10)
+    # 10 stratified folds, trained and evaluated in parallel
+    codes, categories = encode_dataset(df)
+    results = cross_validate(codes, train_fold, predict_fold, folds=10,
+                             train_args=(categories, list_names, limit,
+                                         cache_dir), seed=seed)
+    for index, test_accuracy in enumerate(results["accuracy"]):
+        print('Accuracy on turn', index, "-->", test_accuracy)
+    print("Total accuracy is: ", results["accuracy"].mean())
 
 
 if __name__ == "__main__":
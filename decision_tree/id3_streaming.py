@@ -0,0 +1,293 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+from id3 import encode_dataset, gains_from_counts, route_rows, CompiledTree
+
+
+# Out-of-core ID3. The CSV is only ever read in chunks of chunk_size
+# rows. A first pass collects the categories of every column, after
+# that the tree is grown from (feature, value, class) count tables kept
+# per open leaf:
+#   levelwise - one pass per tree level, every open leaf of the level is
+#               split from its complete counts (the same tree as
+#               build_tree_encoded on the whole data set)
+#   hoeffding - a single pass, a leaf splits as soon as the Hoeffding
+#               bound says its best feature is the best one for the
+#               whole stream
+# Memory grows with the number of open leaves, not with the data.
+
+
+def _read_chunks(path, names, chunk_size, dtype=None):
+    return pd.read_csv(path, names=names, chunksize=chunk_size, dtype=dtype)
+
+
+def _sort_key(value):
+    """ Sort mixed-type columns deterministically. """
+    return type(value).__name__, value
+
+
+def scan_categories(path, names, chunk_size=100000, dtype=None):
+    """ Pass 0 - sorted distinct values of every column. """
+    seen = [set() for _ in names]
+    for chunk in _read_chunks(path, names, chunk_size, dtype):
+        for j, column in enumerate(names):
+            seen[j].update(pd.unique(chunk[column]).tolist())
+    return [sorted(values, key=_sort_key) for values in seen]
+
+
+def _encoded_chunks(path, names, categories, chunk_size, dtype=None):
+    for chunk in _read_chunks(path, names, chunk_size, dtype):
+        yield encode_dataset(chunk, categories)[0]
+
+
+def _count_leaves(codes, slots, features, num_slots, num_values, num_classes,
+                  target):
+    """ (slot, feature, value, class) and (slot, class) counts of the
+        rows of a chunk, rows outside the open leaves have slot -1. """
+    keep = slots >= 0
+    codes, slots = codes[keep], slots[keep]
+    classes = codes[:, target].astype(np.intp)
+    combined = ((slots[:, None] * features.shape[0] +
+                 np.arange(features.shape[0])) * num_values +
+                codes[:, features].astype(np.intp)) * num_classes + \
+        classes[:, None]
+    counts = np.bincount(combined.ravel(), minlength=num_slots *
+                         features.shape[0] * num_values * num_classes)
+    class_counts = np.bincount(slots * num_classes + classes,
+                               minlength=num_slots * num_classes)
+    return (counts.reshape(num_slots, features.shape[0], num_values,
+                           num_classes),
+            class_counts.reshape(num_slots, num_classes))
+
+
+def build_tree_levelwise(path, names, limit=4, target=0, chunk_size=100000,
+                         dtype=None, categories=None):
+    """ ID3 with one pass over the CSV per tree level (plus one for the
+        categories unless they are given). Returns (tree, categories),
+        tree is the nested dict of build_decision_tree. """
+    if categories is None:
+        categories = scan_categories(path, names, chunk_size, dtype)
+    num_classes = len(categories[target])
+    features = np.array([j for j in range(len(names)) if j != target],
+                        dtype=np.intp)
+    num_values = max([len(categories[j]) for j in features], default=1)
+
+    # Routing arrays of the partial tree - node 0 is the root, node 1 a
+    # closed leaf for values without a branch
+    feature, child_offset, children = [-1, -1], [0, 0], []
+    root = {}
+    default = None
+    # open leaf: node -> (remaining feature mask, parent class,
+    #                     dict to store the subtree in, key in that dict)
+    frontier = {0: (np.ones(features.shape[0], dtype=bool), None, root, None)}
+    while frontier:
+        open_nodes = list(frontier)
+        slot_of = np.full(len(feature), -1, dtype=np.intp)
+        slot_of[open_nodes] = np.arange(len(open_nodes))
+        routing = (np.array(feature, dtype=np.intp),
+                   np.array(child_offset, dtype=np.intp),
+                   np.array(children, dtype=np.intp))
+        counts = np.zeros((len(open_nodes), features.shape[0], num_values,
+                           num_classes), dtype=np.int64)
+        class_counts = np.zeros((len(open_nodes), num_classes),
+                                dtype=np.int64)
+        for codes in _encoded_chunks(path, names, categories, chunk_size,
+                                     dtype):
+            slots = slot_of[route_rows(codes, *routing)]
+            chunk_counts, chunk_class_counts = _count_leaves(
+                codes, slots, features, len(open_nodes), num_values,
+                num_classes, target)
+            counts += chunk_counts
+            class_counts += chunk_class_counts
+        if default is None:
+            default = categories[target][class_counts[0].argmax()] \
+                if class_counts[0].any() else None
+
+        next_frontier = {}
+        for slot, node in enumerate(open_nodes):
+            remaining, parent_node_class, container, key = frontier[node]
+            if parent_node_class is None:
+                parent_node_class = default
+            node_class_counts = class_counts[slot]
+            present = np.flatnonzero(node_class_counts)
+
+            # Stop conditions as in build_tree_encoded
+            if present.shape[0] == 1:
+                container[key] = categories[target][present[0]]
+                continue
+            if node_class_counts.sum() < limit or not remaining.any():
+                container[key] = parent_node_class
+                continue
+
+            candidates = np.flatnonzero(remaining)
+            gains = gains_from_counts(counts[slot, candidates],
+                                      node_class_counts)
+            best = candidates[int(np.argmax(gains))]
+            best_feature = features[best]
+            node_class = categories[target][node_class_counts.argmax()]
+
+            feature[node] = best_feature
+            child_offset[node] = len(children)
+            children.extend([1] * (len(categories[best_feature]) + 1))
+            child_remaining = remaining.copy()
+            child_remaining[best] = False
+            branches = {}
+            container[key] = {names[best_feature]: branches}
+            value_counts = counts[slot, best].sum(axis=1)
+            for value in np.flatnonzero(value_counts):
+                child = len(feature)
+                feature.append(-1)
+                child_offset.append(0)
+                children[child_offset[node] + value] = child
+                next_frontier[child] = (child_remaining, node_class, branches,
+                                        categories[best_feature][value])
+        frontier = next_frontier
+    return root.get(None, default), categories
+
+
+def build_tree_hoeffding(path, names, target=0, chunk_size=100000,
+                         grace_period=200, delta=1e-7, tie_threshold=0.05,
+                         dtype=None, categories=None):
+    """ Hoeffding tree (VFDT) in a single pass over the CSV. A leaf
+        re-evaluates its split after every grace_period new instances
+        and splits when the gain of the best feature beats the second
+        one by more than the Hoeffding bound
+            sqrt(R^2 ln(1 / delta) / (2 n)),   R = log2(classes),
+        or when the bound drops below tie_threshold. Splits take effect
+        from the next chunk on. The bound assumes rows arrive in random
+        order - shuffle files sorted by class (like breast-cancer.data)
+        first. Returns (tree, categories). """
+    if categories is None:
+        categories = scan_categories(path, names, chunk_size, dtype)
+    num_classes = len(categories[target])
+    features = np.array([j for j in range(len(names)) if j != target],
+                        dtype=np.intp)
+    num_values = max([len(categories[j]) for j in features], default=1)
+    value_range = math.log2(max(num_classes, 2))
+
+    feature, child_offset, children = [-1, -1], [0, 0], []
+    root = {}
+    # leaf node -> [remaining feature mask, counts, class counts,
+    #               instances since the last check, parent class,
+    #               dict to store the subtree in, key in that dict]
+    leaves = {0: [np.ones(features.shape[0], dtype=bool),
+                  np.zeros((features.shape[0], num_values, num_classes),
+                           dtype=np.int64),
+                  np.zeros(num_classes, dtype=np.int64), 0, None, root, None]}
+    for codes in _encoded_chunks(path, names, categories, chunk_size, dtype):
+        nodes = route_rows(codes, np.array(feature, dtype=np.intp),
+                           np.array(child_offset, dtype=np.intp),
+                           np.array(children, dtype=np.intp))
+        touched = np.unique(nodes)
+        touched = touched[touched != 1]
+        slot_of = np.full(len(feature), -1, dtype=np.intp)
+        slot_of[touched] = np.arange(touched.shape[0])
+        chunk_counts, chunk_class_counts = _count_leaves(
+            codes, slot_of[nodes], features, touched.shape[0], num_values,
+            num_classes, target)
+
+        for slot, node in enumerate(touched.tolist()):
+            leaf = leaves[node]
+            leaf[1] += chunk_counts[slot]
+            leaf[2] += chunk_class_counts[slot]
+            leaf[3] += int(chunk_class_counts[slot].sum())
+            remaining, counts, class_counts = leaf[0], leaf[1], leaf[2]
+            if leaf[3] < grace_period or not remaining.any() or \
+                    np.count_nonzero(class_counts) < 2:
+                continue
+            leaf[3] = 0
+
+            candidates = np.flatnonzero(remaining)
+            gains = gains_from_counts(counts[candidates], class_counts)
+            order = np.argsort(gains)[::-1]
+            second = gains[order[1]] if order.shape[0] > 1 else 0.0
+            bound = math.sqrt(value_range ** 2 * math.log(1 / delta) /
+                              (2 * class_counts.sum()))
+            if gains[order[0]] - second <= bound and bound >= tie_threshold:
+                continue
+
+            best = candidates[order[0]]
+            best_feature = features[best]
+            node_class = categories[target][class_counts.argmax()]
+            feature[node] = best_feature
+            child_offset[node] = len(children)
+            children.extend([1] * (len(categories[best_feature]) + 1))
+            child_remaining = remaining.copy()
+            child_remaining[best] = False
+            branches = {}
+            leaf[5][leaf[6]] = {names[best_feature]: branches}
+            del leaves[node]
+            for value in range(len(categories[best_feature])):
+                child = len(feature)
+                feature.append(-1)
+                child_offset.append(0)
+                children[child_offset[node] + value] = child
+                leaves[child] = [child_remaining,
+                                 np.zeros_like(counts),
+                                 np.zeros_like(class_counts), 0, node_class,
+                                 branches, categories[best_feature][value]]
+
+    # Leaves predict their majority class, empty ones their parent's
+    for remaining, counts, class_counts, _, parent_node_class, container, \
+            key in leaves.values():
+        container[key] = categories[target][class_counts.argmax()] \
+            if class_counts.any() else parent_node_class
+    return root[None], categories
+
+
+def train_streaming(path, names, limit=4, target=0, chunk_size=100000,
+                    mode='levelwise', dtype=None, **hoeffding_args):
+    """ Compiled tree trained from a CSV that does not fit in memory.
+        mode is 'levelwise' or 'hoeffding' (limit is not used there,
+        grace_period, delta and tie_threshold are). """
+    categories = scan_categories(path, names, chunk_size, dtype)
+    if mode == 'levelwise':
+        tree, _ = build_tree_levelwise(path, names, limit, target, chunk_size,
+                                       dtype, categories)
+    elif mode == 'hoeffding':
+        tree, _ = build_tree_hoeffding(path, names, target, chunk_size,
+                                       dtype=dtype, categories=categories,
+                                       **hoeffding_args)
+    else:
+        raise ValueError('Unknown training mode: ' + str(mode))
+
+    # The default leaf answers with the overall majority class
+    class_counts = np.zeros(len(categories[target]), dtype=np.int64)
+    for codes in _encoded_chunks(path, names, categories, chunk_size, dtype):
+        class_counts += np.bincount(codes[:, target],
+                                    minlength=len(categories[target]))
+    default = categories[target][class_counts.argmax()]
+    return CompiledTree(tree, categories, names, target, default)
+
+
+def evaluate_streaming(compiled, path, chunk_size=100000, dtype=None):
+    """ Accuracy of a compiled tree over a CSV, chunk by chunk. """
+    correct, total = 0, 0
+    for codes in _encoded_chunks(path, compiled.names, compiled.categories,
+                                 chunk_size, dtype):
+        correct += int(np.sum(compiled.predict(codes) ==
+                              codes[:, compiled.target]))
+        total += codes.shape[0]
+    return correct / max(total, 1)
+
+
+def main():
+    """ Out-of-core ID3 on the breast cancer data set. """
+    list_names = ["class", "age", "menopause", "tumor-size", "inv-nodes",
+                  "node-caps", "deg-malig", "breast", "breast-quad", "irradiat"]
+    limit = int(input("Please enter constant K: minimum number of instances required per tree level: ").strip())
+    mode = input("Training mode (levelwise/hoeffding) [levelwise]: ").strip()
+
+    start_time = time.time()
+    compiled = train_streaming("breast-cancer.data", list_names, limit,
+                               chunk_size=50, mode=mode or 'levelwise',
+                               grace_period=50)
+    print("Nodes:", compiled.num_nodes)
+    print("Training accuracy is: ",
+          evaluate_streaming(compiled, "breast-cancer.data", chunk_size=50))
+    print(" --- %.5f seconds ---" % (time.time() - start_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -18,13 +18,13 @@ class Node:
         self._parent = parent_node
 
     def add_neighbour(self, neighbour, weight):
-        self._neighbours[neighbours] = weight
+        self._neighbours[neighbour] = weight
 
     def get_neighbours(self):
         return self._neighbours
 
     def get_weight(self, neighbour):
-        return self._neighbour[neighbour]
+        return self._neighbours[neighbour]
 
 class Graph:
     """Simple graph - supports adding nodes & edges"""
@@ -34,6 +34,19 @@ class Graph:
     def __iter__(self):
         return iter(self._dict.values())
 
+    @classmethod
+    def from_graph(cls, graph):
+        """Build from anything exposing list_nodes() and
+        list_neighbours(node), e.g. a CSRGraph from read_edge_list"""
+        new_graph = cls()
+        for node in graph.list_nodes():
+            new_graph.add_node(node)
+        for node in graph.list_nodes():
+            new_graph._dict[node]._neighbours.update(
+                (neighbour, weight)
+                for weight, neighbour in graph.list_neighbours(node))
+        return new_graph
+
     def add_node(self, node):
         dict_node = Node(node)
         self._dict[node] = dict_node
@@ -44,4 +57,9 @@ class Graph:
         else:
             return None
 
-    def 
+    def add_edge(self, node1, node2, weight):
+        """Directed edge node1 -> node2"""
+        for node in (node1, node2):
+            if node not in self._dict:
+                self.add_node(node)
+        self._dict[node1].add_neighbour(node2, weight)
@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+
+# k-fold cross-validation shared by decision_tree and naive_bayes.
+# The data set is an encoded integer matrix (rows x columns), folds are
+# arrays of row indices. Models are plugged in as two module-level
+# functions:
+#   train(codes, rows, *train_args) -> model
+#   predict(model, codes, rows)     -> predicted target codes
+# In a process pool the matrix lives in shared memory, so every worker
+# attaches to it once instead of receiving pickled DataFrames.
+
+_shared_data = {}
+
+
+def stratified_folds(labels, folds=10, seed=None):
+    """ Row index arrays of the folds. Rows are shuffled, grouped by
+        label and dealt round-robin, so every class is spread evenly and
+        fold sizes differ by at most one. """
+    labels = np.asarray(labels)
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(labels.shape[0])
+    order = order[np.argsort(labels[order], kind='stable')]
+    assignment = np.empty(labels.shape[0], dtype=np.intp)
+    assignment[order] = np.arange(labels.shape[0]) % folds
+    return [np.flatnonzero(assignment == fold) for fold in range(folds)]
+
+
+def _share_array(array):
+    """ Copy an array into a new shared memory block. """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _init_worker(codes_spec):
+    """ Pool initializer - attach the encoded data set once. """
+    name, shape, dtype = codes_spec
+    block = shared_memory.SharedMemory(name=name)
+    _shared_data['block'] = block
+    _shared_data['codes'] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _run_fold(fold, train, predict, train_rows, test_rows, target,
+              train_args):
+    """ Train on train_rows, evaluate on test_rows. """
+    codes = _shared_data['codes']
+    start_time = time.perf_counter()
+    model = train(codes, train_rows, *train_args)
+    train_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    predicted = np.asarray(predict(model, codes, test_rows))
+    predict_seconds = time.perf_counter() - start_time
+    return {'fold': fold,
+            'train_size': train_rows.shape[0],
+            'test_size': test_rows.shape[0],
+            'accuracy': float(np.mean(predicted == codes[test_rows, target]))
+            if test_rows.shape[0] else float('nan'),
+            'train_seconds': train_seconds,
+            'predict_seconds': predict_seconds}
+
+
+def cross_validate(codes, train, predict, folds=10, target=0, train_args=(),
+                   workers=None, seed=None):
+    """ Stratified k-fold cross-validation of an encoded data set.
+        folds is a number of folds or a list of test row index arrays.
+        workers=1 runs in-process, otherwise folds run in a process pool.
+        Returns a DataFrame with one row of metrics and timings per fold. """
+    codes = np.ascontiguousarray(codes)
+    if isinstance(folds, int):
+        folds = stratified_folds(codes[:, target], folds, seed)
+    all_rows = np.arange(codes.shape[0])
+    tasks = [(fold, train, predict,
+              np.setdiff1d(all_rows, test_rows, assume_unique=True),
+              np.asarray(test_rows, dtype=np.intp), target, tuple(train_args))
+             for fold, test_rows in enumerate(folds)]
+
+    if workers == 1:
+        _shared_data['codes'] = codes
+        try:
+            results = [_run_fold(*task) for task in tasks]
+        finally:
+            _shared_data.clear()
+        return pd.DataFrame(results)
+
+    block, codes_spec = _share_array(codes)
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(codes_spec, )) as pool:
+            results = [future.result() for future in
+                       [pool.submit(_run_fold, *task) for task in tasks]]
+    finally:
+        block.close()
+        block.unlink()
+    return pd.DataFrame(results)
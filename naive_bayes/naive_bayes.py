@@ -1,3 +1,5 @@
+import os
+import sys
 import numpy as np
 import pandas as pd
 
@@ -55,7 +57,52 @@ def test_naive_bayes(test_data, prior, vote_list):
             answer = index
     return "republican" if answer == 0 else "democrat"
 
+
+def encode_votes(df):
+    """ Category codes of every column, the party in column 0.
+        Returns (codes, categories) with categories[j] sorted. """
+    codes = np.empty(df.shape, dtype=np.uint8)
+    categories = []
+    for j, column in enumerate(df.columns):
+        column_codes, column_values = pd.factorize(df[column], sort=True)
+        codes[:, j] = column_codes
+        categories.append(list(column_values))
+    return codes, categories
+
+
+def train_naive_bayes_encoded(codes, rows, num_values, num_classes):
+    """ Training on encoded rows (class in column 0). Returns log priors
+        (classes, ) and Laplace-smoothed log likelihoods (features,
+        values, classes), counted with one bincount. """
+    train_codes = codes[rows].astype(np.intp)
+    classes = train_codes[:, 0]
+    features = train_codes.shape[1] - 1
+    class_sizes = np.bincount(classes, minlength=num_classes)
+    combined = (np.arange(features) * num_values + train_codes[:, 1:]) * \
+        num_classes + classes[:, None]
+    counts = np.bincount(combined.ravel(),
+                         minlength=features * num_values * num_classes)
+    counts = counts.reshape(features, num_values, num_classes)
+    log_prior = np.log(np.maximum(class_sizes, 1) / max(rows.shape[0], 1))
+    log_likelihood = np.log((counts + 1) / (class_sizes + num_values))
+    return log_prior, log_likelihood
+
+
+def test_naive_bayes_encoded(model, codes, rows):
+    """ Most probable class code of every encoded row. """
+    log_prior, log_likelihood = model
+    feature_codes = codes[rows, 1:].astype(np.intp)
+    scores = log_prior + log_likelihood[np.arange(feature_codes.shape[1]),
+                                        feature_codes].sum(axis=1)
+    return scores.argmax(axis=1)
+
+
 def main():
+    # model_evaluation is a sibling script folder, not a package
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 '..', 'model_evaluation'))
+    from cross_validation import cross_validate
+
     names_columns = ["party", "handicapped-infants", "water-project-cost-sharing",
                      "adoption-of-the-budget-resolution", "physician-fee-freeze",
                      "el-salvador-aid", "religious-groups-in-schools", "anti-satellite-test-ban",
@@ -65,31 +112,15 @@ def main():
 
     df = pd.read_csv("house-votes-84.data", names=names_columns)
 
-    accuracy = 0
-    list_df = []
-    df_remainder = df
-    
-    while len(list_df) < 10:
-        if len(list_df) < 5:
-            df_chunk = df_remainder.sample(n=44)
-        else:
-            df_chunk = df_remainder.sample(n=43)
-        df_remainder = df_remainder.drop(df_chunk.index)
-        list_df.append(df_chunk)
-
-    for index, test in enumerate(list_df):
-        test_df = test
-        train_df = pd.concat(list_df[:index] + list_df[index+1:])
-        prior, vote_list = train_naive_bayes(train_df)
-
-        turn_accuracy = 0
-        for row in range(test_df.shape[0]):
-            if test_df.iloc[row]["party"] == test_naive_bayes(test_df.iloc[row].drop("party"), prior, vote_list):
-                turn_accuracy += 1
-
-        print('Accuracy on turn', index, "-->", turn_accuracy / test_df.shape[0])
-        accuracy += turn_accuracy / test_df.shape[0]
-    print("Total accuracy is: ", accuracy / 10)
+    # 10 stratified folds, trained and evaluated in parallel
+    codes, categories = encode_votes(df)
+    num_values = max(len(values) for values in categories[1:])
+    results = cross_validate(codes, train_naive_bayes_encoded,
+                             test_naive_bayes_encoded, folds=10,
+                             train_args=(num_values, len(categories[0])))
+    for index, turn_accuracy in enumerate(results["accuracy"]):
+        print('Accuracy on turn', index, "-->", turn_accuracy)
+    print("Total accuracy is: ", results["accuracy"].mean())
 
 
 if __name__ == "__main__":
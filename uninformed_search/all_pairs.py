@@ -0,0 +1,113 @@
+import numpy as np
+from undirected_graph import UndirectedWeightedGraph
+from undirected_search import ucs_undirected_tree
+
+
+# Floyd-Warshall is used for small or dense graphs (one vectorized
+# min-plus update per intermediate node), repeated Dijkstra otherwise.
+DENSE_NODES = 256
+DENSE_FILL = 0.1
+
+
+class AllPairs(object):
+    """ All-pairs shortest paths: a distance matrix plus a next-hop
+        matrix (-1 where no path exists), indexed like node_names. """
+
+    def __init__(self, node_names, distance, next_hop):
+        self.node_names = node_names
+        self.node_index = {node: index for index, node
+                           in enumerate(node_names)}
+        self.distance_matrix = distance
+        self.next_hop = next_hop
+
+    def distance(self, start, goal):
+        """ Shortest path cost (inf if unreachable), O(1). """
+        return self.distance_matrix[self.node_index[start],
+                                    self.node_index[goal]]
+
+    def path(self, start, goal):
+        """ Shortest path as a node list (None if unreachable),
+            O(path length). """
+        index, goal_index = self.node_index[start], self.node_index[goal]
+        if self.next_hop[index, goal_index] < 0 and index != goal_index:
+            return None
+        path = [start]
+        while index != goal_index:
+            index = self.next_hop[index, goal_index]
+            path.append(self.node_names[index])
+        return path
+
+
+def _weight_matrix(graph):
+    """ Dense weight matrix (inf for missing edges, min over duplicates). """
+    node_names = graph.list_nodes()
+    node_index = {node: index for index, node in enumerate(node_names)}
+    weights = np.full((len(node_names), len(node_names)), np.inf)
+    for index, node in enumerate(node_names):
+        for edge_tuple in graph.list_neighbours(node):
+            neighbour = node_index[edge_tuple[1]]
+            weights[index, neighbour] = min(weights[index, neighbour],
+                                            edge_tuple[0])
+    return node_names, weights
+
+
+def floyd_warshall(graph):
+    """ Vectorized Floyd-Warshall: for every intermediate node k the
+        whole matrix is relaxed at once through row/column broadcasting. """
+    node_names, distance = _weight_matrix(graph)
+    size = len(node_names)
+    next_hop = np.where(np.isfinite(distance),
+                        np.arange(size)[np.newaxis, :], -1)
+    np.fill_diagonal(distance, 0)
+    np.fill_diagonal(next_hop, np.arange(size))
+    for k in range(size):
+        through_k = distance[:, k, np.newaxis] + distance[np.newaxis, k, :]
+        shorter = through_k < distance
+        distance = np.where(shorter, through_k, distance)
+        next_hop = np.where(shorter, next_hop[:, k, np.newaxis], next_hop)
+    return AllPairs(node_names, distance, next_hop)
+
+
+def repeated_dijkstra(graph):
+    """ One single-source Uniform-Cost Search per node, suited to
+        sparse graphs. Next hops are read off each shortest-path tree. """
+    node_names = graph.list_nodes()
+    size = len(node_names)
+    distance = np.empty((size, size))
+    next_hop = np.full((size, size), -1, dtype=np.int64)
+    for source, node in enumerate(node_names):
+        _, cost, pred = ucs_undirected_tree(graph, node)
+        distance[source] = cost
+        next_hop[source, source] = source
+        # Follow pred back to the source or to a node whose first hop
+        # is known, then hand that hop to the whole chain. Cost order
+        # is not enough - with zero-weight edges a predecessor can tie
+        # with its child.
+        for target in range(size):
+            chain = []
+            node = target
+            while next_hop[source, node] < 0 and pred[node] >= 0:
+                chain.append(node)
+                node = pred[node]
+            if not chain:
+                continue
+            hop = chain[-1] if node == source else next_hop[source, node]
+            next_hop[source, chain] = hop
+    return AllPairs(node_names, distance, next_hop)
+
+
+def _build_all_pairs(graph):
+    size = len(graph.list_nodes())
+    entries = sum(len(graph.list_neighbours(node))
+                  for node in graph.list_nodes())
+    if size <= DENSE_NODES or entries >= DENSE_FILL * size * size:
+        return floyd_warshall(graph)
+    return repeated_dijkstra(graph)
+
+
+def all_pairs_shortest_paths(graph):
+    """ AllPairs for the graph. For an UndirectedWeightedGraph the result
+        is cached on the graph and rebuilt only after it is modified. """
+    if isinstance(graph, UndirectedWeightedGraph):
+        return graph.derived('all_pairs', _build_all_pairs)
+    return _build_all_pairs(graph)
@@ -0,0 +1,235 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from undirected_graph import CSRGraph
+
+
+# Frontier and visited sets are bitsets - one bit per node packed
+# into uint64 words. Whole levels are processed with NumPy at once,
+# nothing is printed.
+
+
+def bitset_empty(num_bits):
+    """ All-zero bitset able to hold num_bits bits. """
+    return np.zeros((num_bits + 63) // 64, dtype=np.uint64)
+
+
+def bitset_from_indices(indices, num_bits):
+    """ Bitset with exactly the given bits set. """
+    mask = np.zeros(bitset_empty(num_bits).shape[0] * 64, dtype=bool)
+    mask[indices] = True
+    return np.packbits(mask, bitorder='little').view('<u8')
+
+
+def bitset_members(bitset, num_bits):
+    """ Sorted indices of the bits set. """
+    bits = np.unpackbits(bitset.view(np.uint8), bitorder='little')
+    return np.flatnonzero(bits[:num_bits])
+
+
+def bitset_test(bitset, indices):
+    """ Boolean array - is each of the given bits set? """
+    words = bitset[indices >> 6]
+    return ((words >> (indices & 63).astype(np.uint64)) & np.uint64(1)) == 1
+
+
+def expand_nodes(csr, nodes):
+    """ All adjacency entries of the given nodes as two parallel
+        arrays (owner node, neighbour node). """
+    starts = csr.indptr[nodes]
+    counts = csr.indptr[nodes + 1] - starts
+    total = int(counts.sum())
+    owners = np.repeat(nodes, counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    neighbours = csr.indices[np.repeat(starts, counts) + offsets]
+    return owners, neighbours
+
+
+def bfs_top_down_step(csr, frontier_nodes, visited, distance, parent, level):
+    """ Frontier nodes push to their unvisited neighbours. """
+    owners, neighbours = expand_nodes(csr, frontier_nodes)
+    fresh = ~bitset_test(visited, neighbours)
+    neighbours, first = np.unique(neighbours[fresh], return_index=True)
+    parent[neighbours] = owners[fresh][first]
+    distance[neighbours] = level
+    return neighbours
+
+
+def bfs_bottom_up_step(csr, frontier, visited, distance, parent, level):
+    """ Unvisited nodes pull from any neighbour in the frontier. """
+    unvisited = bitset_members(~visited, csr.num_nodes)
+    owners, neighbours = expand_nodes(csr, unvisited)
+    hit = bitset_test(frontier, neighbours)
+    owners, first = np.unique(owners[hit], return_index=True)
+    parent[owners] = neighbours[hit][first]
+    distance[owners] = level
+    return owners
+
+
+def bfs_direction_optimizing(csr, start, alpha=14, beta=24):
+    """ Breadth-First Search over a CSRGraph (Beamer's heuristic).
+        Top-down steps are used while the frontier is small, bottom-up
+        steps once the edges leaving the frontier outnumber the edges
+        of the unvisited nodes by a factor of alpha. The search goes
+        back to top-down when the frontier shrinks below n / beta.
+        Returns (distance, parent) arrays indexed by node id, -1 marks
+        unreachable nodes and the parent of start. """
+    if not isinstance(csr, CSRGraph):
+        csr = CSRGraph.from_graph(csr)
+        start = csr.node_id(start)
+    num_nodes = csr.num_nodes
+    degrees = csr.degrees()
+    distance = np.full(num_nodes, -1, dtype=np.int64)
+    parent = np.full(num_nodes, -1, dtype=np.int64)
+    distance[start] = 0
+
+    frontier_nodes = np.array([start], dtype=np.int64)
+    frontier = bitset_from_indices(frontier_nodes, num_nodes)
+    visited = frontier.copy()
+    unexplored_edges = int(degrees.sum()) - int(degrees[start])
+    bottom_up = False
+    level = 0
+    while frontier_nodes.shape[0]:
+        level += 1
+        frontier_edges = int(degrees[frontier_nodes].sum())
+        if not bottom_up and frontier_edges > unexplored_edges / alpha:
+            bottom_up = True
+        elif bottom_up and frontier_nodes.shape[0] < num_nodes / beta:
+            bottom_up = False
+
+        if bottom_up:
+            frontier_nodes = bfs_bottom_up_step(csr, frontier, visited,
+                                                distance, parent, level)
+        else:
+            frontier_nodes = bfs_top_down_step(csr, frontier_nodes, visited,
+                                               distance, parent, level)
+        frontier = bitset_from_indices(frontier_nodes, num_nodes)
+        visited |= frontier
+        unexplored_edges -= int(degrees[frontier_nodes].sum())
+    return distance, parent
+
+
+# Multi-source BFS: up to 64 sources are searched at once, node v keeps
+# one uint64 word whose bit i says "reached from source i". The CSR
+# arrays live in shared memory, so pool workers do not copy the graph.
+
+UNREACHABLE = np.iinfo(np.uint16).max
+
+_shared_graph = {}
+
+
+def _share_array(array):
+    """ Copy an array into a new shared memory block. """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach_array(spec):
+    """ View an array stored in an existing shared memory block. """
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _init_worker(indptr_spec, indices_spec, out_path, shape):
+    """ Pool initializer - attach the graph and the output matrix once. """
+    indptr_block, indptr = _attach_array(indptr_spec)
+    indices_block, indices = _attach_array(indices_spec)
+    _shared_graph['blocks'] = (indptr_block, indices_block)
+    # Only the shared arrays - a CSRGraph would allocate private
+    # weights and node names in every worker
+    _shared_graph['indptr'] = indptr
+    _shared_graph['indices'] = indices
+    _shared_graph['out'] = np.memmap(out_path, dtype=np.uint16, mode='r+',
+                                     shape=shape)
+
+
+def multi_source_bfs(csr, sources):
+    """ Hop distances from at most 64 sources, bit-parallel.
+        Returns a (len(sources), n) uint16 matrix, UNREACHABLE marks
+        nodes that cannot be reached. """
+    return _multi_source_bfs(csr.indptr, csr.indices, sources)
+
+
+def _multi_source_bfs(indptr, indices, sources):
+    """ multi_source_bfs on the bare CSR arrays. """
+    num_nodes = indptr.shape[0] - 1
+    num_sources = len(sources)
+    if num_sources > 64:
+        raise ValueError('At most 64 sources per batch!')
+    distance = np.full((num_sources, num_nodes), UNREACHABLE, dtype=np.uint16)
+    distance[np.arange(num_sources), sources] = 0
+
+    seen = np.zeros(num_nodes, dtype=np.uint64)
+    np.bitwise_or.at(seen, sources, np.left_shift(
+        np.uint64(1), np.arange(num_sources, dtype=np.uint64)))
+    visit = seen.copy()
+    has_neighbours = np.diff(indptr) > 0
+    level = 0
+    while visit.any():
+        level += 1
+        if level >= UNREACHABLE:
+            raise OverflowError('Hop distance does not fit in uint16!')
+        # Pull: a node is reached from every source one of its
+        # neighbours was reached from on the previous level.
+        # A zero word is appended so that reduceat never indexes past
+        # the end for trailing nodes without neighbours.
+        gathered = np.append(visit[indices], np.uint64(0))
+        reached = np.bitwise_or.reduceat(gathered, indptr[:-1])
+        reached[~has_neighbours] = 0
+        reached &= ~seen
+        visit = reached
+        seen |= reached
+
+        active = np.flatnonzero(reached)
+        bits = np.unpackbits(reached[active].view(np.uint8),
+                             bitorder='little').reshape(-1, 64)
+        nodes, source_bits = np.nonzero(bits[:, :num_sources])
+        distance[source_bits, active[nodes]] = level
+    return distance
+
+
+def _bfs_batch(first_row, sources):
+    """ Pool task - one batch of sources into the shared output. """
+    out = _shared_graph['out']
+    out[first_row:first_row + len(sources)] = \
+        _multi_source_bfs(_shared_graph['indptr'], _shared_graph['indices'],
+                          sources)
+    out.flush()
+    return first_row
+
+
+def all_pairs_hop_distances(csr, out_path, sources=None, workers=None,
+                            batch_size=64):
+    """ Hop-distance matrix written to a memory-mapped uint16 file.
+        Source batches of batch_size (<= 64) are spread across a process
+        pool, the graph is shared with the workers via shared memory.
+        Row i holds the distances from sources[i] (all nodes by default). """
+    if not isinstance(csr, CSRGraph):
+        csr = CSRGraph.from_graph(csr)
+    if sources is None:
+        sources = np.arange(csr.num_nodes)
+    sources = np.asarray(sources, dtype=np.int64)
+    shape = (sources.shape[0], csr.num_nodes)
+    out = np.memmap(out_path, dtype=np.uint16, mode='w+', shape=shape)
+    del out
+
+    indptr_block, indptr_spec = _share_array(csr.indptr)
+    indices_block, indices_spec = _share_array(
+        np.ascontiguousarray(csr.indices, dtype=np.int64))
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(indptr_spec, indices_spec,
+                                           out_path, shape)) as pool:
+            batches = [pool.submit(_bfs_batch, row,
+                                   sources[row:row + batch_size])
+                       for row in range(0, shape[0], batch_size)]
+            for batch in batches:
+                batch.result()
+    finally:
+        for block in (indptr_block, indices_block):
+            block.close()
+            block.unlink()
+    return np.memmap(out_path, dtype=np.uint16, mode='r', shape=shape)
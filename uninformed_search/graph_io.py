@@ -0,0 +1,246 @@
+import json
+import struct
+import numpy as np
+import pandas as pd
+from undirected_graph import UndirectedWeightedGraph, CSRGraph
+
+
+# Binary snapshot layout (little-endian):
+#   header      - see HEADER below
+#   node names  - UTF-8 JSON list, node i is names[i]
+#   indptr      - int64[num_nodes + 1]
+#   indices     - int32 or int64[num_entries]
+#   weights     - float64[num_entries]
+# Arrays start on ALIGNMENT byte boundaries so they can be memory-mapped.
+# Node names must be JSON-representable: strings, numbers, booleans,
+# None or (nested) tuples of those. JSON turns tuples into lists, so lists
+# are read back as tuples - a list cannot be a node name anyway.
+
+MAGIC = b'AIGRAPH\x00'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sIIQQQQQQQ4s')
+ALIGNMENT = 64
+FLAG_DIRECTED = 1
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_graph(path, graph, directed=False):
+    """ Write a graph to a versioned binary snapshot.
+        Accepts an UndirectedWeightedGraph, a CSRGraph or a plain
+        adjacency dict {node: [(weight, neighbour), ...]} as used by
+        informed_search (set directed for those). Node names must be
+        JSON-representable, otherwise a ValueError is raised. """
+    if isinstance(graph, dict):
+        graph = UndirectedWeightedGraph(graph)
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_graph(graph)
+
+    try:
+        names = json.dumps(graph.node_names).encode('utf-8')
+    except (TypeError, ValueError) as error:
+        raise ValueError('Node names must be JSON-representable: ' +
+                         str(error))
+    indptr = np.ascontiguousarray(graph.indptr, dtype='<i8')
+    index_dtype = '<i4' if graph.num_nodes < 2 ** 31 else '<i8'
+    indices = np.ascontiguousarray(graph.indices, dtype=index_dtype)
+    weights = np.ascontiguousarray(graph.weights, dtype='<f8')
+
+    names_offset = HEADER.size
+    indptr_offset = _align(names_offset + len(names))
+    indices_offset = _align(indptr_offset + indptr.nbytes)
+    weights_offset = _align(indices_offset + indices.nbytes)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION,
+                         FLAG_DIRECTED if directed else 0,
+                         graph.num_nodes, graph.num_edges,
+                         names_offset, len(names),
+                         indptr_offset, indices_offset, weights_offset,
+                         index_dtype.encode('ascii'))
+
+    with open(path, 'wb') as graph_file:
+        for offset, chunk in ((0, header), (names_offset, names),
+                              (indptr_offset, indptr.tobytes()),
+                              (indices_offset, indices.tobytes()),
+                              (weights_offset, weights.tobytes())):
+            graph_file.write(b'\x00' * (offset - graph_file.tell()))
+            graph_file.write(chunk)
+
+
+def _name_from_json(name):
+    """ JSON lists back to (nested) tuples, e.g. grid coordinates. """
+    if isinstance(name, list):
+        return tuple(_name_from_json(item) for item in name)
+    return name
+
+
+def read_header(path):
+    """ Parsed snapshot header as a dict. """
+    with open(path, 'rb') as graph_file:
+        raw = graph_file.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise ValueError('File too short to be a graph snapshot!')
+    fields = HEADER.unpack(raw)
+    if fields[0] != MAGIC:
+        raise ValueError('Not a graph snapshot: bad magic number!')
+    if fields[1] != FORMAT_VERSION:
+        raise ValueError('Unsupported snapshot version: ' + str(fields[1]))
+    keys = ('magic', 'version', 'flags', 'num_nodes', 'num_entries',
+            'names_offset', 'names_size', 'indptr_offset', 'indices_offset',
+            'weights_offset', 'index_dtype')
+    header = dict(zip(keys, fields))
+    header['index_dtype'] = \
+        header['index_dtype'].rstrip(b'\x00').decode('ascii')
+    header['directed'] = bool(header['flags'] & FLAG_DIRECTED)
+    return header
+
+
+def load_graph(path, mmap=True):
+    """ Load a snapshot as a CSRGraph. With mmap the arrays are
+        read-only views of the file, so loading is near-instant and
+        processes loading the same file share its pages. """
+    header = read_header(path)
+    with open(path, 'rb') as graph_file:
+        graph_file.seek(header['names_offset'])
+        names = [_name_from_json(name) for name in
+                 json.loads(graph_file.read(header['names_size']))]
+
+    def array(offset, dtype, count):
+        if mmap:
+            if count == 0:
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(path, dtype=dtype, mode='r',
+                             offset=offset, shape=(count, ))
+        return np.fromfile(path, dtype=dtype, count=count, offset=offset)
+
+    indptr = array(header['indptr_offset'], '<i8', header['num_nodes'] + 1)
+    indices = array(header['indices_offset'], header['index_dtype'],
+                    header['num_entries'])
+    weights = array(header['weights_offset'], '<f8', header['num_entries'])
+    return CSRGraph(indptr, indices, weights, names)
+
+
+def load_graph_dict(path):
+    """ Load a snapshot as an adjacency dict {node: [(weight, node)]}. """
+    return load_graph(path).to_graph_dict()
+
+
+# Edge-list ingestion. Files are read twice in chunks of chunk_size
+# lines: the first pass builds the node-name table and the degrees,
+# the second scatters every chunk straight into preallocated CSR arrays.
+# Apart from the output only one chunk is held in memory at a time.
+
+EDGE_LIST_FORMATS = ('edgelist', 'csv', 'dimacs')
+
+
+EDGE_COLUMNS = ['source', 'target', 'weight']
+
+
+def _read_edge_chunks(path, fmt, chunk_size, header):
+    """ Yield (sources, targets, weights) chunks. Lines may mix two and
+        three columns, missing weights are 1. """
+    if fmt == 'edgelist':
+        reader = pd.read_csv(path, sep=r'\s+', header=None, comment='#',
+                             names=EDGE_COLUMNS, chunksize=chunk_size)
+    elif fmt == 'csv':
+        reader = pd.read_csv(path, header=0 if header else None,
+                             comment='#', names=EDGE_COLUMNS,
+                             chunksize=chunk_size)
+    elif fmt == 'dimacs':
+        # c <comment> / p sp <nodes> <arcs> / a <from> <to> <weight>
+        reader = pd.read_csv(path, sep=r'\s+', header=None, comment='c',
+                             names=['kind', 'source', 'target', 'weight'],
+                             chunksize=chunk_size)
+    else:
+        raise ValueError('Unknown edge list format: ' + str(fmt))
+
+    for chunk in reader:
+        if fmt == 'dimacs':
+            chunk = chunk.loc[chunk['kind'] == 'a', 'source':].astype(
+                {'source': np.int64, 'target': np.int64, 'weight': float})
+        if chunk['target'].isna().any():
+            raise ValueError('Edge lines need at least two columns!')
+        yield (chunk['source'].to_numpy(), chunk['target'].to_numpy(),
+               chunk['weight'].astype(float).fillna(1.0).to_numpy())
+
+
+def read_edge_list(path, fmt='edgelist', chunk_size=1000000, directed=None,
+                   header=False, progress=None):
+    """ Build a CSRGraph from an edge-list file without per-edge calls.
+        fmt is 'edgelist' (whitespace separated 'u v [w]'), 'csv'
+        ('u,v[,w]') or 'dimacs' (shortest-path 'a u v w' arcs). Missing
+        weights are 1. Undirected edges are stored both ways - directed
+        defaults to True for DIMACS arcs and False otherwise.
+        progress, if given, is called as progress(pass_number, edges). """
+    if fmt not in EDGE_LIST_FORMATS:
+        raise ValueError('Unknown edge list format: ' + str(fmt))
+    if directed is None:
+        directed = fmt == 'dimacs'
+    node_index = {}
+    node_names = []
+
+    def encode(names):
+        """ Chunk of node names to ids, new names get the next ids. """
+        uniques = pd.unique(names)
+        unique_names = uniques.tolist()  # plain Python names, JSON safe
+        for name in unique_names:
+            if name not in node_index:
+                node_index[name] = len(node_names)
+                node_names.append(name)
+        lookup = np.array([node_index[name] for name in unique_names],
+                          dtype=np.int64)
+        return lookup[pd.Index(uniques).get_indexer(names)]
+
+    def directed_pairs(sources, targets, weights):
+        sources, targets = encode(sources), encode(targets)
+        if weights is None:
+            weights = np.ones(sources.shape[0])
+        if directed:
+            return sources, targets, weights
+        return (np.concatenate((sources, targets)),
+                np.concatenate((targets, sources)),
+                np.concatenate((weights, weights)))
+
+    # Pass 1 - node table and degrees
+    degrees = np.zeros(0, dtype=np.int64)
+    edges = 0
+    for sources, targets, weights in _read_edge_chunks(path, fmt,
+                                                       chunk_size, header):
+        sources, _, _ = directed_pairs(sources, targets, weights)
+        counts = np.bincount(sources, minlength=len(node_names))
+        counts[:degrees.shape[0]] += degrees
+        degrees = counts
+        edges += targets.shape[0]
+        if progress is not None:
+            progress(1, edges)
+    degrees = np.concatenate((degrees, np.zeros(len(node_names) -
+                                                degrees.shape[0],
+                                                dtype=np.int64)))
+
+    indptr = np.zeros(len(node_names) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+    index_dtype = np.int32 if len(node_names) < 2 ** 31 else np.int64
+    indices = np.empty(indptr[-1], dtype=index_dtype)
+    edge_weights = np.empty(indptr[-1])
+    fill = indptr[:-1].copy()
+
+    # Pass 2 - scatter each chunk into its rows
+    edges = 0
+    for sources, targets, weights in _read_edge_chunks(path, fmt,
+                                                       chunk_size, header):
+        edges += targets.shape[0]
+        sources, targets, weights = directed_pairs(sources, targets, weights)
+        order = np.argsort(sources, kind='stable')
+        sources = sources[order]
+        counts = np.bincount(sources, minlength=len(node_names))
+        group_start = np.cumsum(counts) - counts
+        rank = np.arange(sources.shape[0]) - group_start[sources]
+        positions = fill[sources] + rank
+        indices[positions] = targets[order]
+        edge_weights[positions] = weights[order]
+        fill += counts
+        if progress is not None:
+            progress(2, edges)
+
+    return CSRGraph(indptr, indices, edge_weights, node_names)
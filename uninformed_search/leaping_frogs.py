@@ -1,3 +1,4 @@
+from array import array
 from collections import deque
 
 
@@ -44,7 +45,7 @@ def build_and_traverse(start_state, goal_state):
     stack = deque([start_state])
     path_dict = {}
     path_dict[start_state] = 'NULL'
-    visited = set(start_state)
+    visited = {start_state}
     while stack:
         current_state = stack.pop()
         if current_state == goal_state:
@@ -64,6 +65,173 @@ def build_and_traverse(start_state, goal_state):
                 stack.append(child_state)
 
 
+# Bit-packed states: lily pad i takes bits 2i and 2i + 1 of an integer
+# (00 - free, 01 - '>' frog, 10 - '<' frog), so a move is two XORs and
+# states are hashed as ints instead of strings. The search runs from
+# both ends and keeps parents as indices in compact arrays.
+
+FREE, RIGHT_FROG, LEFT_FROG = 0, 1, 2
+PAD_CODES = {'_': FREE, '>': RIGHT_FROG, '<': LEFT_FROG}
+PAD_CHARS = '_><'
+
+
+def encode_state(state):
+    """ String state to its 2-bits-per-pad integer. """
+    encoded = 0
+    for pad, char in enumerate(state):
+        encoded |= PAD_CODES[char] << (2 * pad)
+    return encoded
+
+
+def decode_state(encoded, pads):
+    """ 2-bits-per-pad integer back to its string state. """
+    return "".join(PAD_CHARS[(encoded >> (2 * pad)) & 3]
+                   for pad in range(pads))
+
+
+def _free_pad(encoded, low_mask):
+    """ Index of the only pad with both bits clear. """
+    return ((~(encoded | (encoded >> 1)) & low_mask).bit_length() - 1) // 2
+
+
+def _is_dead_end(encoded, low_mask, backwards):
+    """ '>><<' can never be undone going forwards (nor '<<>>' going
+        backwards) - those four frogs are stuck for good. """
+    right, left = encoded & low_mask, (encoded >> 1) & low_mask
+    if backwards:
+        right, left = left, right
+    return bool(right & (right >> 2) & (left >> 4) & (left >> 6))
+
+
+def _frog_moves(encoded, pads, low_mask, backwards):
+    """ Successor states (predecessors if backwards) of a packed state. """
+    free = _free_pad(encoded, low_mask)
+    # Going forwards '>' frogs come from the left and '<' frogs from the
+    # right; undoing a move brings each back from the other side.
+    sides = ((-1, RIGHT_FROG), (-2, RIGHT_FROG), (1, LEFT_FROG),
+             (2, LEFT_FROG))
+    for offset, frog in sides:
+        if backwards:
+            offset = -offset
+        pad = free + offset
+        if 0 <= pad < pads and (encoded >> (2 * pad)) & 3 == frog:
+            yield encoded ^ (frog << (2 * pad)) ^ (frog << (2 * free))
+
+
+def solve_frogs_bitpacked(number_frogs):
+    """ Bidirectional BFS over packed states.
+        Returns the list of string states from start to goal. """
+    pads = 2 * number_frogs + 1
+    low_mask = int('01' * pads, 2)
+    start = encode_state('>' * number_frogs + '_' + '<' * number_frogs)
+    goal = encode_state('<' * number_frogs + '_' + '>' * number_frogs)
+
+    # One search tree per direction: state -> index, the states
+    # themselves, and the parent index of every state (-1 for the root).
+    trees = []
+    for root in (start, goal):
+        trees.append(({root: 0}, [root], array('q', [-1]), [root]))
+    meeting = start if start == goal else None
+
+    while meeting is None:
+        # Grow the smaller frontier by one level.
+        side = 0 if len(trees[0][3]) <= len(trees[1][3]) else 1
+        index_of, states, parents, frontier = trees[side]
+        other_index_of = trees[1 - side][0]
+        if not frontier:
+            return None
+        next_frontier = []
+        for state in frontier:
+            parent = index_of[state]
+            for child in _frog_moves(state, pads, low_mask, side == 1):
+                if child in index_of or \
+                        _is_dead_end(child, low_mask, side == 1):
+                    continue
+                index_of[child] = len(states)
+                states.append(child)
+                parents.append(parent)
+                next_frontier.append(child)
+                if child in other_index_of:
+                    meeting = child
+                    break
+            if meeting is not None:
+                break
+        trees[side] = (index_of, states, parents, next_frontier)
+
+    path = []
+    for side in (0, 1):
+        index_of, states, parents, _ = trees[side]
+        half = []
+        index = index_of[meeting]
+        while index != -1:
+            half.append(states[index])
+            index = parents[index]
+        path.extend(half[::-1] if side == 0 else half[1:])
+    return [decode_state(state, pads) for state in path]
+
+
+# The optimal solution needs no search at all. Its moves come in groups
+# of sizes 1, 2, ..., n, n, n, ..., 2, 1 that alternate between '>' and
+# '<' frogs, and inside a group a frog jumps over the other kind when it
+# can and slides otherwise. Only the current state and a few counters
+# are kept, so solutions can be streamed for any number of frogs.
+
+
+def stream_frog_moves(number_frogs, validate=False):
+    """ Yield the (from_position, to_position) moves of the optimal
+        solution in order. With validate every move is checked against
+        observe_possible_frog_moves (O(n) per move). """
+    state = bytearray(b'>' * number_frogs + b'_' + b'<' * number_frogs)
+    free = number_frogs
+    group_sizes = [range(1, number_frogs + 1), [number_frogs],
+                   range(number_frogs, 0, -1)]
+    frog = ord('>')
+    for sizes in group_sizes:
+        for size in sizes:
+            for _ in range(size):
+                step = -1 if frog == ord('>') else 1
+                other = ord('<') if frog == ord('>') else ord('>')
+                jump_from = free + 2 * step
+                if 0 <= jump_from < len(state) and \
+                        state[jump_from] == frog and \
+                        state[free + step] == other:
+                    from_position = jump_from
+                else:
+                    from_position = free + step
+                if validate and (from_position, free) not in \
+                        observe_possible_frog_moves(state.decode()):
+                    raise ValueError('Invalid move ' +
+                                     str((from_position, free)) +
+                                     ' in state ' + state.decode())
+                state[free], state[from_position] = frog, ord('_')
+                yield from_position, free
+                free = from_position
+            frog = ord('<') if frog == ord('>') else ord('>')
+
+
+def stream_frog_states(number_frogs, validate=False):
+    """ Yield the successive states of the optimal solution,
+        start and goal included. """
+    state = bytearray(b'>' * number_frogs + b'_' + b'<' * number_frogs)
+    yield state.decode()
+    for from_position, to_position in stream_frog_moves(number_frogs,
+                                                        validate):
+        state[from_position], state[to_position] = \
+            state[to_position], state[from_position]
+        yield state.decode()
+
+
+def write_frog_solution(number_frogs, out_file, states=False):
+    """ Stream the solution to an open text file, one move
+        ('from to') or one state per line. """
+    if states:
+        for state in stream_frog_states(number_frogs):
+            out_file.write(state + '\n')
+    else:
+        for move in stream_frog_moves(number_frogs):
+            out_file.write('%d %d\n' % move)
+
+
 # Instead of the build_tree procedure, it would be much more
 # cost-efficient to directly traverse the states
 # The more effective approach is implemented above.
@@ -141,7 +309,9 @@ def main():
     # build_tree_wrapper(start_state, goal_state, frog_state_dict)
     # dfs_frog_puzzle_wrapper(start_state, goal_state, frog_state_dict)
 
-    build_and_traverse(start_state, goal_state)
+    # build_and_traverse(start_state, goal_state)
+    for state in solve_frogs_bitpacked(number_frogs)[::-1]:
+        print(state)
 
 
 if __name__ == '__main__':
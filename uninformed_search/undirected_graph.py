@@ -1,3 +1,8 @@
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+
 class UndirectedWeightedGraph(object):
     """ A simple Python Graph class (undirected, weighted) """
 
@@ -7,6 +12,9 @@ class UndirectedWeightedGraph(object):
         if graph_dict is None:
             graph_dict = {}
         self.__graph_dict = graph_dict
+        self.__components = None  # built on the first connectivity query
+        self.__version = 0  # bumped by every edit
+        self.__derived = {}  # cached results, dropped by every edit
 
     def list_nodes(self):
         """ Nodes listing. """
@@ -39,15 +47,20 @@ class UndirectedWeightedGraph(object):
         """ Addition of a single vertex """
         if node not in self.__graph_dict:
             self.__graph_dict[node] = []
+            self.__mutated()
+            if self.__components is not None:
+                self.__components.add_node(node)
 
     def add_edge(self, edge):
         """ Addition of a single edge """
         (node1, node2, weight) = tuple(edge)
         for node in [node1, node2]:
-            if node not in self.__graph_dict:
-                self.__graph_dict[node] = []
-        self.__graph_dict[node1].append((weight. node2))
+            self.add_node(node)
+        self.__graph_dict[node1].append((weight, node2))
         self.__graph_dict[node2].append((weight, node1))
+        self.__mutated()
+        if self.__components is not None:
+            self.__components.union(node1, node2)
 
     def remove_node(self, node):
         """ Removal of nodes.
@@ -56,9 +69,12 @@ class UndirectedWeightedGraph(object):
         try:
             del self.__graph_dict[node]
             for item in self.__graph_dict:
-                for edge_tuple in self.__graph_dict[item]:
-                    if edge_tuple[1] == node:
-                        self.__graph_dict[item].remove(edge_tuple)
+                self.__graph_dict[item][:] = [
+                    edge_tuple for edge_tuple in self.__graph_dict[item]
+                    if edge_tuple[1] != node]
+            self.__mutated()
+            if self.__components is not None:
+                self.__components.invalidate()
         except KeyError:
             print('Node specified not found in graph!')
 
@@ -74,12 +90,43 @@ class UndirectedWeightedGraph(object):
     def remove_edge(self, node1, node2):
         """ Removes edges given two nodes. """
         if self.__is_edge(node1, node2):
-            for edge_tuple in self.__graph_dict[node1]:
-                if edge_tuple[1] == node2:
-                    self.__graph_dict[node1].remove(edge_tuple)
-            for edge_tuple in self.__graph_dict[node2]:
-                if edge_tuple[1] == node1:
-                    self.__graph_dict[node2].remove(edge_tuple)
+            self.__graph_dict[node1][:] = [
+                edge_tuple for edge_tuple in self.__graph_dict[node1]
+                if edge_tuple[1] != node2]
+            self.__graph_dict[node2][:] = [
+                edge_tuple for edge_tuple in self.__graph_dict[node2]
+                if edge_tuple[1] != node1]
+            self.__mutated()
+            if self.__components is not None:
+                self.__components.invalidate()
+
+    def __mutated(self):
+        self.__version += 1
+        self.__derived.clear()
+
+    @property
+    def version(self):
+        """ Edit counter - changes whenever the graph is modified
+            through its methods. """
+        return self.__version
+
+    def derived(self, key, build):
+        """ Cached build(self), recomputed only after the graph has been
+            modified. Edits made to graph_dict behind the graph's back
+            are not noticed. """
+        if key not in self.__derived:
+            self.__derived[key] = build(self)
+        return self.__derived[key]
+
+    def components(self):
+        """ Connected-components index, kept up to date on edits. """
+        if self.__components is None:
+            self.__components = ComponentsIndex(self)
+        return self.__components
+
+    def is_connected(self, node1, node2):
+        """ Are the two nodes in the same connected component? """
+        return self.components().is_connected(node1, node2)
 
     def __edges_to_printable(self, edge_tuple):
         return '(' + "".join(map(lambda expr: str(expr) + " ", edge_tuple))[:-1] + ')'
@@ -96,3 +143,267 @@ class UndirectedWeightedGraph(object):
                     return_string = return_string[:-2]
                 return_string += ']\n'
         return return_string
+
+
+class ComponentsIndex(object):
+    """ Connected components of an UndirectedWeightedGraph.
+        Insertions are merged with union-find (path halving, union by
+        size), so queries between edits stay near O(1). A removal may
+        split a component, which union-find cannot undo - it only marks
+        the index stale and the next query rebuilds it in O(V + E). """
+
+    def __init__(self, graph):
+        self.__graph = graph
+        self.__parent = {}
+        self.__size = {}
+        self.__stale = True
+
+    def add_node(self, node):
+        if not self.__stale and node not in self.__parent:
+            self.__parent[node] = node
+            self.__size[node] = 1
+
+    def invalidate(self):
+        self.__stale = True
+
+    def __rebuild(self):
+        self.__parent = {node: node for node in self.__graph.list_nodes()}
+        self.__size = {node: 1 for node in self.__parent}
+        self.__stale = False
+        for node in self.__parent:
+            for edge_tuple in self.__graph.list_neighbours(node):
+                self.union(node, edge_tuple[1])
+
+    def find(self, node):
+        """ Representative of the component holding node. """
+        if self.__stale:
+            self.__rebuild()
+        parent = self.__parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, node1, node2):
+        if self.__stale:
+            return  # the next query rebuilds from the graph anyway
+        root1, root2 = self.find(node1), self.find(node2)
+        if root1 == root2:
+            return
+        if self.__size[root1] < self.__size[root2]:
+            root1, root2 = root2, root1
+        self.__parent[root2] = root1
+        self.__size[root1] += self.__size[root2]
+
+    def is_connected(self, node1, node2):
+        return self.find(node1) == self.find(node2)
+
+    def count(self):
+        """ Number of connected components. """
+        if self.__stale:
+            self.__rebuild()
+        return sum(1 for node in self.__parent if self.find(node) == node)
+
+
+class CSRGraph(object):
+    """ Compressed sparse row graph (undirected, weighted).
+        Nodes are numbered 0..n-1, the neighbours of node i are
+        indices[indptr[i]:indptr[i + 1]] with matching weights.
+        Node names are kept in a separate table. """
+
+    def __init__(self, indptr, indices, weights=None, node_names=None):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices)
+        if weights is None:
+            weights = np.ones(self.indices.shape[0])
+        self.weights = np.asarray(weights)
+        if node_names is None:
+            node_names = list(range(self.indptr.shape[0] - 1))
+        self.node_names = list(node_names)
+        self.__node_index = None
+
+    @classmethod
+    def from_graph(cls, graph):
+        """ Build a CSR copy of any graph exposing list_nodes() and
+            list_neighbours(node), e.g. UndirectedWeightedGraph. """
+        node_names = graph.list_nodes()
+        node_index = {node: index for index, node in enumerate(node_names)}
+        indptr = np.zeros(len(node_names) + 1, dtype=np.int64)
+        indices = []
+        weights = []
+        for index, node in enumerate(node_names):
+            for edge_tuple in graph.list_neighbours(node):
+                weights.append(edge_tuple[0])
+                indices.append(node_index[edge_tuple[1]])
+            indptr[index + 1] = len(indices)
+        return cls(indptr, np.array(indices, dtype=np.int64),
+                   np.array(weights, dtype=float), node_names)
+
+    @property
+    def num_nodes(self):
+        return self.indptr.shape[0] - 1
+
+    @property
+    def num_edges(self):
+        """ Number of stored (directed) adjacency entries. """
+        return self.indices.shape[0]
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def node_id(self, node):
+        """ Index of a node given its name. """
+        if self.__node_index is None:
+            self.__node_index = {name: index for index, name
+                                 in enumerate(self.node_names)}
+        return self.__node_index[node]
+
+    def list_nodes(self):
+        return list(self.node_names)
+
+    def to_graph_dict(self):
+        """ Adjacency dict {node: [(weight, neighbour), ...]}, the form
+            UndirectedWeightedGraph and informed_search work with. """
+        return {node: self.list_neighbours(node) for node in self.node_names}
+
+    def __getitem__(self, node):
+        """ graph[node] - lets the informed_search functions, which
+            expect an adjacency dict, run on a CSRGraph directly. """
+        return self.list_neighbours(node)
+
+    def list_neighbours(self, node):
+        """ Same (weight, neighbour) view as UndirectedWeightedGraph. """
+        index = self.node_id(node)
+        begin, end = self.indptr[index], self.indptr[index + 1]
+        return [(weight, self.node_names[neighbour]) for weight, neighbour
+                in zip(self.weights[begin:end].tolist(),
+                       self.indices[begin:end].tolist())]
+
+
+# Copy-on-write snapshots. A GraphSnapshot is never modified once it is
+# published, so reader threads can use one without locks. Writers copy
+# only the adjacency blocks they touch and publish a new version by a
+# single reference swap - readers never wait for an update.
+
+
+class GraphSnapshot(object):
+    """ Immutable version of an undirected weighted graph.
+        Nodes are spread over blocks (dicts) by hash, adjacency lists
+        are tuples of (weight, neighbour). """
+
+    def __init__(self, version, blocks):
+        self.version = version
+        self.blocks = blocks
+
+    def block_of(self, node):
+        return hash(node) % len(self.blocks)
+
+    def __contains__(self, node):
+        return node in self.blocks[self.block_of(node)]
+
+    def list_nodes(self):
+        return [node for block in self.blocks for node in block]
+
+    def list_neighbours(self, node):
+        return self.blocks[self.block_of(node)][node]
+
+    def __getitem__(self, node):
+        return self.list_neighbours(node)
+
+    def list_edges_weighted(self):
+        return [[node, edge_tuple[0], edge_tuple[1]]
+                for block in self.blocks for node in block
+                for edge_tuple in block[node]]
+
+
+class SnapshotWriter(object):
+    """ Builds the next snapshot from a base one. A block is copied the
+        first time an edit touches it, untouched blocks are shared. """
+
+    def __init__(self, base):
+        self.__base = base
+        self.__blocks = list(base.blocks)
+        self.__copied = set()
+
+    def __block(self, node):
+        index = self.__base.block_of(node)
+        if index not in self.__copied:
+            self.__blocks[index] = dict(self.__blocks[index])
+            self.__copied.add(index)
+        return self.__blocks[index]
+
+    def __lookup(self, node):
+        return self.__blocks[self.__base.block_of(node)].get(node)
+
+    def add_node(self, node):
+        if self.__lookup(node) is None:
+            self.__block(node)[node] = ()
+
+    def add_edge(self, edge):
+        (node1, node2, weight) = tuple(edge)
+        for node, neighbour in ((node1, node2), (node2, node1)):
+            block = self.__block(node)
+            block[node] = block.get(node, ()) + ((weight, neighbour), )
+
+    def remove_edge(self, node1, node2):
+        for node, neighbour in ((node1, node2), (node2, node1)):
+            neighbours = self.__lookup(node)
+            if neighbours is not None:
+                self.__block(node)[node] = tuple(
+                    edge_tuple for edge_tuple in neighbours
+                    if edge_tuple[1] != neighbour)
+
+    def remove_node(self, node):
+        neighbours = self.__lookup(node)
+        if neighbours is None:
+            print('Node specified not found in graph!')
+            return
+        for edge_tuple in neighbours:
+            if edge_tuple[1] != node:
+                self.remove_edge(edge_tuple[1], node)
+        del self.__block(node)[node]
+
+    def snapshot(self):
+        return GraphSnapshot(self.__base.version + 1, tuple(self.__blocks))
+
+
+class VersionedGraph(object):
+    """ Undirected weighted graph for many reader threads and one or
+        more writer threads. Readers call snapshot() and keep working on
+        that version, writers publish new versions via edit(). """
+
+    def __init__(self, graph_dict=None, num_blocks=64):
+        blocks = [{} for _ in range(num_blocks)]
+        base = GraphSnapshot(0, tuple(blocks))
+        for node, neighbours in (graph_dict or {}).items():
+            blocks[base.block_of(node)][node] = tuple(neighbours)
+        self.__current = base
+        self.__write_lock = threading.Lock()  # writers only
+
+    def snapshot(self):
+        """ Current version - a plain attribute read, never blocks. """
+        return self.__current
+
+    @contextmanager
+    def edit(self):
+        """ Batch of edits published as one new version on success. """
+        with self.__write_lock:
+            writer = SnapshotWriter(self.__current)
+            yield writer
+            self.__current = writer.snapshot()
+
+    def add_node(self, node):
+        with self.edit() as writer:
+            writer.add_node(node)
+
+    def add_edge(self, edge):
+        with self.edit() as writer:
+            writer.add_edge(edge)
+
+    def remove_edge(self, node1, node2):
+        with self.edit() as writer:
+            writer.remove_edge(node1, node2)
+
+    def remove_node(self, node):
+        with self.edit() as writer:
+            writer.remove_node(node)
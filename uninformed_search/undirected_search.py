@@ -1,5 +1,6 @@
 from collections import deque  # collections.deque for bfs, dfs
 from heapq import heappush, heappop  # heapq for ucs
+import numpy as np
 from undirected_graph import UndirectedWeightedGraph
 
 
@@ -49,48 +50,149 @@ def dfs_undirected_iterative(graph, start):
         print('Node:' + str(node))
 
 
+# Generator versions of the traversals above. Nothing is printed,
+# nodes are produced lazily and explicit stacks replace recursion,
+# so callers can stop early or walk very deep graphs.
+
+
+def bfs_iter(graph, start):
+    """ Breadth-First Search as a generator.
+        Yields (parent, node, depth) in level order,
+        the parent of start is None. """
+    visited = {start}
+    queue = deque([(None, start, 0)])
+    while queue:
+        parent, node, depth = queue.popleft()
+        yield parent, node, depth
+        for edge_tuple in graph.list_neighbours(node):
+            if edge_tuple[1] not in visited:
+                visited.add(edge_tuple[1])
+                queue.append((node, edge_tuple[1], depth + 1))
+
+
+def dfs_iter(graph, start, postorder=False, depth_limit=None):
+    """ Depth-First Search as a generator (explicit stack).
+        Yields (parent, node, depth) in pre-order, or in post-order
+        (the order of dfs_undirected_recursive) if postorder is set.
+        Nodes at depth_limit are yielded but not expanded. With a
+        depth_limit a node is visited again whenever a shallower path to
+        it turns up, so every node within the limit is reached at its
+        smallest depth (a global visited set would hide nodes first met
+        deep on another branch). """
+    visited = {start}
+    best_depth = {start: 0}
+    stack = [(None, start, 0, iter(graph.list_neighbours(start)))]
+    if not postorder:
+        yield None, start, 0
+    while stack:
+        parent, node, depth, neighbours = stack[-1]
+        if depth_limit is None or depth < depth_limit:
+            for edge_tuple in neighbours:
+                child = edge_tuple[1]
+                if depth_limit is None:
+                    fresh = child not in visited
+                    visited.add(child)
+                else:
+                    fresh = depth + 1 < best_depth.get(child, depth_limit + 1)
+                    if fresh:
+                        best_depth[child] = depth + 1
+                if fresh:
+                    if not postorder:
+                        yield node, child, depth + 1
+                    stack.append((node, child, depth + 1,
+                                  iter(graph.list_neighbours(child))))
+                    break
+            else:
+                stack.pop()
+                if postorder:
+                    yield parent, node, depth
+            continue
+        stack.pop()
+        if postorder:
+            yield parent, node, depth
+
+
+def ids_iter(graph, start, max_depth=None):
+    """ Iterative-Deepening Search as a generator.
+        Yields (depth_limit, parent, node, depth) for every pre-order
+        visit of every round. Stops when a round reaches no node at its
+        depth limit (the graph is exhausted) or after max_depth. """
+    depth_limit = 0
+    while max_depth is None or depth_limit <= max_depth:
+        reached_limit = False
+        for parent, node, depth in dfs_iter(graph, start,
+                                            depth_limit=depth_limit):
+            reached_limit = reached_limit or depth == depth_limit
+            yield depth_limit, parent, node, depth
+        if not reached_limit:
+            return
+        depth_limit += 1
+
+
 def ucs_undirected(graph, start, goal):
-    """ In order to find the shortest path,
-        we delete nodes and edges from the graph. """
-    node_cost_dict = {}  # acts as visited list & keeps current path costs
-    node_cost_dict[start] = 0
-    node_pred_dict = {}  # preserves a 'best' predecessor in terms of weight
+    """ Uniform-Cost Search (Dijkstra) from start to goal.
+        The graph is left untouched - the best predecessor of every
+        settled node is kept instead, so the path can be rebuilt.
+        Returns a (cost, path) tuple or None if goal is unreachable. """
+    node_cost_dict = {start: 0}  # best known path costs
+    node_pred_dict = {start: None}  # 'best' predecessor in terms of weight
     priority_queue = [(0, start)]
-    pq_visited = []  # easier check whether an edge should be deleted
+    settled = set()
     while priority_queue:
-        node = heappop(priority_queue)[1]
-        pq_visited.append(node)
+        cost, node = heappop(priority_queue)
+        if node in settled:
+            continue  # stale queue entry, a cheaper one was settled
         if node == goal:
-            return node_cost_dict
+            return cost, reconstruct_path(node_pred_dict, goal)
+        settled.add(node)
         for edge_tuple in graph.list_neighbours(node):
-            # # UNCOMMENT FOR PROBLEM OBSERVATION
-            # print(graph.list_neighbours(node))
-            # print('Node:' + str(node) + ' ->' + str(edge_tuple[1]))
-
-            # # NOTICE THE PROBLEM ONLY CONCERNS THE PATH TO THE
-            # # SOLUTION. OTHERWISE THE IMPLEMENTATION CORRECTLY
-            # # FINDS OPTIMAL COST VALUE FROM S TO G.
-            if edge_tuple[1] not in node_cost_dict:
-                heappush(priority_queue,
-                         tuple((node_cost_dict[node] + edge_tuple[0],
-                                edge_tuple[1])))
-                node_cost_dict[edge_tuple[1]] = node_cost_dict[node] + \
-                    edge_tuple[0]
-                node_pred_dict[edge_tuple[1]] = node
-            else:
-                if node_cost_dict[edge_tuple[1]] > node_cost_dict[node] + \
-                                                            edge_tuple[0]:
-                    node_cost_dict[edge_tuple[1]] = node_cost_dict[node] + \
-                                                            edge_tuple[0]
-                    graph.remove_edge(edge_tuple[1],
-                                      node_pred_dict[edge_tuple[1]])
-                    node_pred_dict[edge_tuple[1]] = node
-                else:
-                    if edge_tuple[1] not in pq_visited:
-                        graph.remove_edge(node, edge_tuple[1])
-        # After deleting the unnecessary edges we are left with a tree.
-        # Now we delete all leaves which don't lead to a solution.
-    return 'No path found!'
+            neighbour = edge_tuple[1]
+            if neighbour in settled:
+                continue
+            new_cost = cost + edge_tuple[0]
+            if neighbour not in node_cost_dict or \
+                    new_cost < node_cost_dict[neighbour]:
+                node_cost_dict[neighbour] = new_cost
+                node_pred_dict[neighbour] = node
+                heappush(priority_queue, (new_cost, neighbour))
+    return None
+
+
+def reconstruct_path(pred_dict, goal):
+    """ Walk the predecessors back from goal to the start node. """
+    path = []
+    node = goal
+    while node is not None:
+        path.append(node)
+        node = pred_dict[node]
+    return path[::-1]
+
+
+def ucs_undirected_tree(graph, start):
+    """ Single-source, all-targets Uniform-Cost Search.
+        Returns the shortest-path tree as arrays: the node list,
+        the cost to every node (inf if unreachable) and the index of
+        every node's predecessor (-1 for start and unreachable nodes). """
+    nodes = graph.list_nodes()
+    node_index = {node: index for index, node in enumerate(nodes)}
+    cost = np.full(len(nodes), np.inf)
+    pred = np.full(len(nodes), -1, dtype=np.int64)
+    settled = np.zeros(len(nodes), dtype=bool)
+    cost[node_index[start]] = 0
+    priority_queue = [(0, node_index[start])]
+    while priority_queue:
+        node_cost, index = heappop(priority_queue)
+        if settled[index]:
+            continue
+        settled[index] = True
+        for edge_tuple in graph.list_neighbours(nodes[index]):
+            neighbour = node_index[edge_tuple[1]]
+            new_cost = node_cost + edge_tuple[0]
+            if not settled[neighbour] and new_cost < cost[neighbour]:
+                cost[neighbour] = new_cost
+                pred[neighbour] = index
+                heappush(priority_queue, (new_cost, neighbour))
+    return nodes, cost, pred
 
 
 def dls_recursive_undirected_wrapper(graph, start, goal_list, depth):
@@ -127,6 +229,90 @@ def ids_undirected(graph, start, goal_list):
     print('Depth reached until solution found --> ' + str(depth))
 
 
+# Each frontier entry is a (node, parent_entry, depth) chain, so paths
+# share their prefixes and the cycle check walks only its own path.
+
+
+def _on_path(entry, node):
+    """ Per-path cycle check. """
+    while entry is not None:
+        if entry[0] == node:
+            return True
+        entry = entry[1]
+    return False
+
+
+def _entry_to_path(entry):
+    path = []
+    while entry is not None:
+        path.append(entry[0])
+        entry = entry[1]
+    return path[::-1]
+
+
+def dls_paths_undirected(graph, start, goal_list, depth):
+    """ Depth-Limited Search (explicit stack) with per-path cycle checks.
+        Returns (path, reached_limit): the path to the first goal found
+        at exactly the given depth (or None), and whether any path got
+        that deep at all. """
+    reached_limit = False
+    stack = [(start, None, 0)]
+    while stack:
+        entry = stack.pop()
+        node, _, node_depth = entry
+        if node_depth == depth:
+            reached_limit = True
+            if node in goal_list:
+                return _entry_to_path(entry), True
+            continue
+        for edge_tuple in reversed(graph.list_neighbours(node)):
+            if not _on_path(entry, edge_tuple[1]):
+                stack.append((edge_tuple[1], entry, node_depth + 1))
+    return None, reached_limit
+
+
+def ids_frontier_undirected(graph, start, goal_list, max_frontier=100000,
+                            max_depth=None):
+    """ Iterative-Deepening Search which keeps the depth-limit frontier
+        of the previous round and only expands that frontier on the next
+        one, instead of restarting from depth 0. Cycles are checked per
+        path, so no node reachable within the limit is missed. If the
+        frontier grows past max_frontier paths it is dropped and the
+        search falls back to plain re-expansion (dls_paths_undirected).
+        Returns (depth, path) for the shallowest goal or None. """
+    if start in goal_list:
+        return 0, [start]
+    frontier = [(start, None, 0)]
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        depth += 1
+        next_frontier = []
+        for entry in frontier:
+            for edge_tuple in graph.list_neighbours(entry[0]):
+                if _on_path(entry, edge_tuple[1]):
+                    continue
+                child = (edge_tuple[1], entry, depth)
+                if edge_tuple[1] in goal_list:
+                    return depth, _entry_to_path(child)
+                next_frontier.append(child)
+        frontier = next_frontier
+        if len(frontier) > max_frontier:
+            break
+    else:
+        return None
+
+    # Memory cap hit - the next rounds re-expand from the start node.
+    while max_depth is None or depth < max_depth:
+        depth += 1
+        path, reached_limit = dls_paths_undirected(graph, start,
+                                                   goal_list, depth)
+        if path is not None:
+            return depth, path
+        if not reached_limit:
+            return None
+    return None
+
+
 def main():
     """Playground for graph traversal algorithms"""
     graph_dict = {'A': [(1, 'B'), (1, 'S')],
@@ -149,6 +335,9 @@ def main():
     print('-'*20)
     dfs_undirected_iterative(graph, next(iter(graph_dict)))
     print('-'*20)
+    print([node for _, node, _ in bfs_iter(graph, 'A')])
+    print([node for _, node, _ in dfs_iter(graph, 'A', postorder=True)])
+    print('-'*20)
 
     new_graph_dict = {'S': [(7, 'A'), (9, 'B'), (14, 'C')],
                       'A': [(7, 'S'), (10, 'B'), (15, 'D')],
@@ -160,7 +349,8 @@ def main():
     new_graph = UndirectedWeightedGraph(new_graph_dict)
     print(new_graph)
     print(ucs_undirected(new_graph, 'S', 'G'))
-    print(new_graph)  # Need to 'cut' non-goal leaves
+    print(ucs_undirected_tree(new_graph, 'S'))
+    print(new_graph)  # The graph is not modified by the search
 
     print('-'*20)
     print(graph)
@@ -168,6 +358,7 @@ def main():
     print('-'*20)
     print(graph)
     ids_undirected(graph, 'A', ['F', 'E'])
+    print(ids_frontier_undirected(graph, 'A', ['F', 'E']))
 
 
 if __name__ == "__main__":